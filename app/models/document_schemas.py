@@ -1,36 +1,53 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict
+from typing import List, Literal, Optional
 
-class Clause(BaseModel):
-    clause_title: Optional[str] = None
-    clause_text: Optional[str] = None
+# Single source of truth for the document analysis output:
+# the LLM JSON schema and the response validation both derive from these.
+#
+# Every field is required (nullable where the value may be unknown) and
+# unknown keys are rejected: this is what OpenAI strict structured output
+# accepts, and it makes `{}` or a wrongly shaped object fail validation,
+# so the repair step runs instead of passing an empty analysis through.
 
-class DefenceRequirements(BaseModel):
-    documents_required: List[str] = []
-    previous_filings_required: List[str] = []
-    internal_records_required: List[str] = []
 
-class LegalityAnalysis(BaseModel):
-    is_notice_legally_defective: Optional[bool] = None
-    potential_defects: List[str] = []
-    risk_level: Optional[str] = None
+class PrimaryParties(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    client_or_noticee: Optional[str]
+    opposite_party_or_notifier: Optional[str]
+
+class DocumentMetadata(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    document_title: Optional[str]
+    document_type: Optional[str]
+    issuing_authority_or_court: Optional[str]
+    addressed_to: Optional[str]
+    primary_parties: PrimaryParties
+    other_parties_involved: List[str]
+
+class LegalityAssessment(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    is_notice_legally_valid: Optional[bool]
+    authority_error_possible: Optional[bool]
+    party_non_compliance_possible: Optional[bool]
+    identified_issues_or_defects: List[str]
+    overall_risk_level: Literal["low", "medium", "high"]
+
+class JudicialPrecedent(BaseModel):
+    model_config = ConfigDict(extra="forbid")
 
-class SimilarCase(BaseModel):
-    court: str
     case_name: str
-    year: Optional[str] = None
-    principle: str
-    relevance: str
+    court: Optional[str]
+    legal_principle: Optional[str]
+    relevance_to_present_document: Optional[str]
 
 class DocumentAnalysisResponse(BaseModel):
-    document_title: Optional[str] = None
-    document_type: Optional[str] = None
-    sender_party: Optional[str] = None
-    receiver_party: Optional[str] = None
-
-    key_points: List[str] = []
-    clauses: List[Clause] = []
+    model_config = ConfigDict(extra="forbid")
 
-    defence_requirements: DefenceRequirements = DefenceRequirements()
-    legality_analysis: LegalityAnalysis = LegalityAnalysis()
-    similar_cases: List[SimilarCase] = []
+    document_metadata: DocumentMetadata
+    key_points_summary: List[str]
+    defence_preparation_checklist: List[str]
+    legality_assessment: LegalityAssessment
+    relevant_judicial_precedents: List[JudicialPrecedent]
@@ -1,14 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
-
-class DraftRequest(BaseModel):
-    template_type: str
-    client_name: str
-    opposite_party: str
-    facts: str
-    tone: str
-    template_text: Optional[str] = None 
-    doc_hash: Optional[str] = None
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Optional
 
 class RefineRequest(BaseModel):
     selected_text: str
@@ -17,6 +8,11 @@ class RefineRequest(BaseModel):
 class ExportRequest(BaseModel):
     content: str
 
+class SearchRequest(BaseModel):
+    query: str
+    k: int = Field(5, ge=1, le=50)   # bounds faiss k / HNSW efSearch
+    doc_hashes: Optional[List[str]] = None   # None → search all documents
+
 class EmailRequest(BaseModel):
     recipient: EmailStr
     subject: str
@@ -31,3 +27,5 @@ class DraftRequest(BaseModel):
     tone: str | None = "formal"
     web_context: str | None = None
     language: str = "english"   # allowed: english, hindi, bilingual
+    template_text: str | None = None
+    doc_hash: str | None = None     # indexed document used for RAG context
@@ -1,21 +1,31 @@
 #drafting.py
-from fastapi import APIRouter, Response, HTTPException, UploadFile, File, Body
+from fastapi import APIRouter, Response, HTTPException, UploadFile, File, Form, Body
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-import os
-import tempfile
+import json
 import asyncio
-from fastapi.encoders import jsonable_encoder
 
-from app.models.schemas import DraftRequest, RefineRequest, ExportRequest, EmailRequest
-from app.services.ai_engine import generate_legal_draft, refine_text, suggest_case_laws_ai
+from app.models.schemas import DraftRequest, RefineRequest, ExportRequest, EmailRequest, SearchRequest
+from app.services.ai_engine import generate_legal_draft, stream_legal_draft, refine_text, suggest_case_laws_ai
 from app.services.export_engine import export_to_word, export_to_pdf
 from app.services.validator import validate_draft
 from app.services.email_engine import send_draft_email
-from app.services.document_intelligence import analyze_legal_document
+from app.services.ingestion import analyze_upload, IngestionError
+from app.services.job_queue import job_queue
+from app.services.response_cache import response_cache
+from app.services.document_intelligence import structured_output_metrics
+from app.services.precedent_index import precedent_index
 from app.utils.file_handler import read_file_content
 from app.utils.chunk_and_index import build_index_from_text
-from app.utils.retrieval import retrieve_top_k_chunks
-from app.services.scraper import scrape_legal_context
+from app.utils.embedding_pool import run_embedding_job, run_query_job
+from app.utils.query_batcher import query_batcher
+from app.utils.query_cache import query_cache
+from app.utils.index_cache import index_cache
+from app.utils.extraction_cache import extraction_cache
+from app.utils.context_packer import packing_metrics
+from app.utils.legal_embeddings import is_model_loaded
+from app.utils.retrieval import retrieve_top_k_chunks, search_corpus
+from app.utils.vector_store import corpus_store
 
 router = APIRouter(prefix="/draft", tags=["Drafting Studio"])
 
@@ -29,76 +39,98 @@ class CaseLawRequest(BaseModel):
 # =========================
 @router.post("/analyze-document")
 async def analyze_document(file: UploadFile = File(...)):
+    raw_bytes = await file.read()
+    try:
+        return await analyze_upload(raw_bytes, file.filename)
+    except IngestionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # 1️⃣ Parse ONCE
-    document_text = read_file_content(file)
-    clean_text = document_text.replace("\x00", "").strip()
-
-    if len(clean_text) < 50:
-        raise HTTPException(
-            status_code=400,
-            detail="This PDF cannot be read programmatically."
-        )
-
-    # 2️⃣ Index DIRECTLY from TEXT (NO temp PDF nonsense)
-    doc_hash = build_index_from_text(
-        clean_text,
-        source_name=file.filename
-    )
-
-    if not doc_hash:
-        raise HTTPException(
-            status_code=400,
-            detail="Indexing failed: empty document."
-        )
 
-    # 3️⃣ LLM analysis (doc_hash aware)
-    analysis_model = await analyze_legal_document(
-        clean_text,
-        doc_hash=doc_hash
+# =========================
+# DOCUMENT ANALYSIS AS A BACKGROUND JOB
+# =========================
+@router.post("/analyze-document/jobs", status_code=202)
+async def submit_analysis_job(file: UploadFile = File(...)):
+    raw_bytes = await file.read()
+    filename = file.filename
+
+    job_id = job_queue.submit(
+        "analyze-document",
+        lambda report, executor: analyze_upload(raw_bytes, filename, report=report, executor=executor)
     )
-    analysis = jsonable_encoder(analysis_model)
-
-    # 4️⃣ Optional enrichment (never crash)
-    try:
-        scraped = await asyncio.to_thread(
-            scrape_legal_context,
-            clean_text[:150],
-            "generic"
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    job.pop("result")
+    return job
+
+
+@router.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    job = job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    if job["status"] == "failed":
+        # Same status codes as the inline /analyze-document endpoint
+        status_code = 400 if job["error_type"] == IngestionError.__name__ else 500
+        raise HTTPException(status_code=status_code, detail=job["error"])
+    if job["status"] != "done":
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": job_id, "status": job["status"], "stage": job["stage"]}
         )
-        if isinstance(scraped, list):
-            analysis.setdefault("relevant_judicial_precedents", [])
-            analysis["relevant_judicial_precedents"].extend(scraped)
-    except Exception:
-        pass
-
-    return {
-        **analysis,
-        "doc_hash": doc_hash
-    }
-
-
+    return job["result"]
 
 
 # =========================
 # MANUAL EMBEDDING ENDPOINT
 # =========================
 @router.post("/embed-document")
-async def embed_document(file: UploadFile = File(...)):
-    text = read_file_content(file)
+async def embed_document(
+    file: UploadFile = File(...),
+    parent_doc_hash: str | None = Form(None)   # previous version of this document
+):
+    if parent_doc_hash and not corpus_store.has_document(parent_doc_hash):
+        raise HTTPException(400, f"Unknown parent_doc_hash: {parent_doc_hash}")
+
+    # pdfplumber / OCR off the event loop, on the ingestion pool
+    text = await asyncio.get_running_loop().run_in_executor(
+        job_queue.executor, read_file_content, file
+    )
     clean_text = text.replace("\x00", "").strip()
 
     if len(clean_text) < 50:
         raise HTTPException(400, "No readable text found in document")
 
-    doc_hash = build_index_from_text(
+    doc_hash = await run_embedding_job(
+        build_index_from_text,
         clean_text,
-        source_name=file.filename
+        source_name=file.filename,
+        parent_doc_hash=parent_doc_hash
     )
 
     return {"status": "embedded", "doc_hash": doc_hash}
 
 
+# =========================
+# CORPUS SEARCH (ONE DOC / SOME DOCS / ALL MATTERS)
+# =========================
+@router.post("/search")
+async def search_documents(request: SearchRequest):
+    results = await run_query_job(
+        search_corpus,
+        request.query,
+        k=request.k,
+        doc_hashes=request.doc_hashes
+    )
+    return {"results": results}
+
+
 @router.post("/generate")
 async def generate_draft_endpoint(data: DraftRequest = Body(...)):
     """
@@ -115,6 +147,55 @@ async def generate_draft_endpoint(data: DraftRequest = Body(...)):
         raise HTTPException(status_code=500, detail=str(e))
     
 
+@router.get("/metrics")
+async def metrics():
+    """In-process cache counters."""
+    return {
+        "index_cache": index_cache.stats(),
+        "corpus": corpus_store.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "structured_output": structured_output_metrics,
+        "precedents": precedent_index.stats(),
+        "context_packing": packing_metrics,
+        "embedding_model_loaded": is_model_loaded(),
+        "query_batcher": query_batcher.stats(),
+        "query_cache": query_cache.stats(),
+    }
+
+
+@router.post("/generate/stream")
+async def generate_draft_stream_endpoint(data: DraftRequest = Body(...)):
+    """
+    Server-sent events: `token` events carry draft text as it is generated,
+    a final `done` event carries validation warnings and TTFT.
+    """
+    async def event_stream():
+        try:
+            async for event, payload in stream_legal_draft(data):
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/refine")
+async def refine_draft(request: RefineRequest):
+    refined = await refine_text(request.selected_text, request.instruction)
+    return {"refined_content": refined}
+
+
+@router.post("/suggest-cases")
+async def suggest_cases(request: CaseLawRequest):
+    suggestions = await suggest_case_laws_ai(request.content)
+    return {"suggestions": suggestions}
+
+
 @router.post("/export/word")
 async def download_word(request: ExportRequest):
     file_stream = export_to_word(request.content)
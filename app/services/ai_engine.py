@@ -1,25 +1,46 @@
-import os
-from dotenv import load_dotenv
-from openai import OpenAI
+import math
+import time
+import asyncio
 
 from app.models.schemas import DraftRequest          # ✅ REQUIRED
 from app.services.validator import validate_draft   # ✅ REQUIRED
+from app.services.llm_client import chat_completion, stream_chat_completion
 from app.utils.prompts import build_legal_prompt
 from app.utils.retrieval import retrieve_top_k_chunks
+from app.utils.context_packer import pack_context, RAG_CONTEXT_TOKENS
+from app.utils.legal_chunker import CHUNK_TARGET_TOKENS
+from app.services.response_cache import response_cache, make_key, make_scope
+from app.utils.embedding_pool import run_query_job
+from app.utils.query_batcher import embed_query
+from app.utils.legal_embeddings import EMBEDDING_MODEL_ID
 
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 MODEL_NAME = "gpt-4o-mini"
+TEMPERATURE = 0.2
+
+# Per-call timeouts (seconds)
+DRAFT_TIMEOUT = 120
+REFINE_TIMEOUT = 120
+SUGGEST_TIMEOUT = 60
+
+# Chunks retrieved for a draft: twice what fits the packer's budget, so
+# dropped near-duplicates can be replaced by the next candidate
+RAG_CANDIDATES = max(3, 2 * math.ceil(RAG_CONTEXT_TOKENS / CHUNK_TARGET_TOKENS))
 
 
 # ======================================================
 # MAIN DRAFT GENERATOR (NOW RAG-AWARE)
 # ======================================================
-async def generate_legal_draft(data: DraftRequest, web_context: str = ""):
+def _rag_context(query: str, doc_hash: str) -> str:
+    """Retrieval + packing; blocking (token counting may load tiktoken files)."""
+    chunks = retrieve_top_k_chunks(query=query, k=RAG_CANDIDATES, doc_hash=doc_hash)
+    rag_context, _ = pack_context(chunks, model=MODEL_NAME)
+    return rag_context
+
+
+async def _build_draft_messages(data: DraftRequest, web_context: str = ""):
     """
-    Generates legal draft.
-    Uses embeddings ONLY if doc_hash is present.
+    RAG context (ONLY if doc_hash is present) + prompt → chat messages.
+    Shared by the blocking and streaming generators.
     """
     # -------------------------
     # 1️⃣ RAG CONTEXT
@@ -27,12 +48,9 @@ async def generate_legal_draft(data: DraftRequest, web_context: str = ""):
     rag_context = web_context
 
     if getattr(data, "doc_hash", None) and not rag_context:
-        chunks = retrieve_top_k_chunks(
-            query=(data.facts or "")[:500],
-            k=5,
-            doc_hash=data.doc_hash
+        rag_context = await run_query_job(
+            _rag_context, (data.facts or "")[:500], data.doc_hash
         )
-        rag_context = "\n\n".join(chunks)
 
     # -------------------------
     # 2️⃣ PROMPT BUILDING
@@ -42,19 +60,90 @@ async def generate_legal_draft(data: DraftRequest, web_context: str = ""):
         web_context=rag_context
     )
 
-    # -------------------------
-    # 3️⃣ LLM CALL
-    # -------------------------
-    response = client.chat.completions.create(
+    return [
+        {"role": "system", "content": "You are a Senior Indian Legal Drafting AI."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+# ======================================================
+# RESPONSE CACHE HELPERS
+# ======================================================
+def _draft_scope(data: DraftRequest, web_context: str = ""):
+    """
+    Everything except the facts: near-duplicate facts may share a draft.
+    The embedding model is part of it: its vectors drive both retrieval
+    and the similarity lookup.
+    """
+    return make_scope(
+        MODEL_NAME, TEMPERATURE, EMBEDDING_MODEL_ID,
+        getattr(data, "template_type", None), data.client_name, data.opposite_party,
+        getattr(data, "tone", None), getattr(data, "language", None),
+        getattr(data, "doc_hash", None), getattr(data, "template_text", None), web_context
+    )
+
+
+async def _cache_lookup(key: str, scope: str = None, similarity_text: str = None):
+    """
+    RETURNS: (cached_text or None, facts vector or None)
+    The vector is handed back so a miss can be stored with it.
+    SQLite calls run in a thread so the event loop never waits on disk.
+    """
+    cached = await asyncio.to_thread(response_cache.get, key)
+    if cached is not None:
+        return cached, None
+
+    vector = None
+    if scope and similarity_text and response_cache.similarity_enabled:
+        vector = await run_query_job(embed_query, similarity_text)
+        cached = await asyncio.to_thread(response_cache.get_similar, scope, vector)
+        if cached is not None:
+            return cached, None
+
+    response_cache.miss()
+    return None, vector
+
+
+async def _cached_completion(messages, timeout: float, scope: str = None, similarity_text: str = None):
+    """chat_completion text, served from the response cache when possible."""
+    key = make_key(MODEL_NAME, TEMPERATURE, messages)
+    cached, vector = await _cache_lookup(key, scope, similarity_text)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
+    response = await chat_completion(
         model=MODEL_NAME,
-        messages=[
-            {"role": "system", "content": "You are a Senior Indian Legal Drafting AI."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.2
+        messages=messages,
+        temperature=TEMPERATURE,
+        timeout=timeout
     )
+    text = response.choices[0].message.content.strip()
+
+    latency_ms = (time.perf_counter() - started) * 1000
+    if text:
+        await asyncio.to_thread(
+            response_cache.put, key, text, latency_ms, scope=scope, vector=vector
+        )
+    return text
 
-    draft_text = response.choices[0].message.content.strip()
+
+async def generate_legal_draft(data: DraftRequest, web_context: str = ""):
+    """
+    Generates legal draft.
+    Uses embeddings ONLY if doc_hash is present.
+    """
+    messages = await _build_draft_messages(data, web_context)
+
+    # -------------------------
+    # 3️⃣ LLM CALL (cached)
+    # -------------------------
+    draft_text = await _cached_completion(
+        messages,
+        timeout=DRAFT_TIMEOUT,
+        scope=_draft_scope(data, web_context),
+        similarity_text=data.facts
+    )
 
     # -------------------------
     # 4️⃣ VALIDATION (template_type required)
@@ -67,15 +156,64 @@ async def generate_legal_draft(data: DraftRequest, web_context: str = ""):
     }
 
 
+async def stream_legal_draft(data: DraftRequest, web_context: str = ""):
+    """
+    Streaming variant of generate_legal_draft.
+
+    Yields (event, payload):
+    - ("token", str) for every content delta
+    - ("done", {"warnings", "ttft_ms", "total_ms"}) once, at the end
+    """
+    started = time.perf_counter()
+    messages = await _build_draft_messages(data, web_context)
+
+    key = make_key(MODEL_NAME, TEMPERATURE, messages)
+    scope = _draft_scope(data, web_context)
+    draft_text, vector = await _cache_lookup(key, scope, data.facts)
+
+    ttft_ms = None
+    if draft_text is not None:
+        # Cache hit → whole draft as a single token event
+        ttft_ms = round((time.perf_counter() - started) * 1000, 1)
+        yield "token", draft_text
+    else:
+        parts = []
+        async for delta in stream_chat_completion(
+            model=MODEL_NAME,
+            messages=messages,
+            temperature=TEMPERATURE,
+            timeout=DRAFT_TIMEOUT
+        ):
+            if ttft_ms is None:
+                ttft_ms = round((time.perf_counter() - started) * 1000, 1)
+            parts.append(delta)
+            yield "token", delta
+
+        draft_text = "".join(parts).strip()
+        if draft_text:  # an empty stream is a failure, not an answer
+            await asyncio.to_thread(
+                response_cache.put,
+                key, draft_text, (time.perf_counter() - started) * 1000, scope=scope, vector=vector
+            )
+
+    total_ms = round((time.perf_counter() - started) * 1000, 1)
+    print(f"⏱️ Draft stream: TTFT {ttft_ms} ms | total {total_ms} ms")
+
+    yield "done", {
+        "warnings": validate_draft(draft_text, data.template_type),
+        "ttft_ms": ttft_ms,
+        "total_ms": total_ms
+    }
+
+
 # ======================================================
-# REFINEMENT TOOL (UNCHANGED)
+# REFINEMENT TOOL
 # ======================================================
 async def refine_text(text, instruction):
     """Refines the ENTIRE document."""
     try:
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
+        return await _cached_completion(
+            [
                 {
                     "role": "system",
                     "content": (
@@ -89,22 +227,20 @@ async def refine_text(text, instruction):
                     "content": f"Instruction: {instruction}\n\nDocument Content:\n{text}"
                 }
             ],
-            temperature=0.2
+            timeout=REFINE_TIMEOUT
         )
-        return response.choices[0].message.content.strip()
     except Exception as e:
         return str(e)
 
 
 # ======================================================
-# CASE LAW SUGGESTION TOOL (UNCHANGED)
+# CASE LAW SUGGESTION TOOL
 # ======================================================
 async def suggest_case_laws_ai(text):
     """Suggests RELEVANT SECTIONS and CASE LAWS."""
     try:
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
+        return await _cached_completion(
+            [
                 {
                     "role": "system",
                     "content": (
@@ -123,8 +259,7 @@ async def suggest_case_laws_ai(text):
                     "content": f"Analyze this draft and find legal grounds:\n{text[:3000]}"
                 }
             ],
-            temperature=0.2
+            timeout=SUGGEST_TIMEOUT
         )
-        return response.choices[0].message.content.strip()
     except Exception:
         return "Error fetching legal research."
@@ -2,56 +2,62 @@
 import os
 import json
 import re
-from dotenv import load_dotenv
-from openai import OpenAI
 import asyncio
+from pydantic import ValidationError
 
+from app.models.document_schemas import DocumentAnalysisResponse
+from app.services.llm_client import chat_completion, stream_chat_completion
+from app.utils.json_stream import IncrementalJSONObjectParser
 from app.utils.retrieval import retrieve_top_k_chunks
+from app.utils.embedding_pool import run_query_job
 
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 MODEL_NAME = "gpt-5-nano"
+ANALYSIS_TIMEOUT = 180  # seconds
 
 MAX_LLM_CHARS = 6000
 
-async def analyze_legal_document(document_text: str, doc_hash: str = None):
-    """
-    Legal analysis using embedded document chunks (RAG).
-    Handles large documents safely.
-    If doc_hash is provided, retrieves only from that document's index.
-    """
-    try:
-        # -----------------------------
-        # 1️⃣ RAG: Retrieve top-k relevant chunks
-        # -----------------------------
-        query_text = document_text[:1000]  # initial slice for embedding query
-        retrieved_chunks = []
+# Hierarchical (map-reduce) mode for long documents
+LONG_DOC_CHARS = int(os.getenv("LONG_DOC_CHARS", str(MAX_LLM_CHARS * 2)))
+ANALYSIS_PARALLELISM = int(os.getenv("ANALYSIS_PARALLELISM", "4"))
 
-        # ✅ Only use RAG if document has meaningful text
-        if len(document_text.strip()) > 200:
-            retrieved_chunks = retrieve_top_k_chunks(
-                query=query_text,
-                k=5,
-                doc_hash=doc_hash  # now per-file retrieval
-            )
+# Bound on LLM calls per long document: sections grow (up to
+# MAX_SECTION_CHARS) so the text fits in MAX_ANALYSIS_SECTIONS; if it still
+# doesn't, an evenly spaced sample of sections is analysed.
+MAX_ANALYSIS_SECTIONS = int(os.getenv("MAX_ANALYSIS_SECTIONS", "16"))
+MAX_SECTION_CHARS = int(os.getenv("MAX_SECTION_CHARS", str(MAX_LLM_CHARS * 4)))
 
-        context = "\n\n".join(retrieved_chunks)
+# USD per 1M tokens (input, output) — for per-document cost reporting
+MODEL_PRICING = {
+    "gpt-5-nano": (0.05, 0.40),
+    "gpt-4o-mini": (0.15, 0.60),
+}
 
-        if not context.strip():
-            context = document_text[:3000]
+RISK_ORDER = {"low": 0, "medium": 1, "high": 2}
 
-        if len(context) > MAX_LLM_CHARS:
-            context = context[:MAX_LLM_CHARS]  # trim for LLM
+# Structured output: schema derived from the response model
+ANALYSIS_SCHEMA = DocumentAnalysisResponse.model_json_schema()
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "legal_document_analysis", "schema": ANALYSIS_SCHEMA, "strict": True},
+}
 
-        if not context.strip():
-            # fallback to first 3k chars
-            context = document_text[:3000]
+REPAIR_PROMPT = (
+    "You repair JSON. Return ONLY a JSON object that conforms to the schema, "
+    "keeping every value from the input that fits. Do not add commentary."
+)
 
-        # -----------------------------
-        # 2️⃣ SYSTEM PROMPT
-        # -----------------------------
-        system_prompt = """
+# Malformed-output accounting (exported at /draft/metrics)
+structured_output_metrics = {
+    "calls": 0,
+    "malformed": 0,          # output unparseable or failed validation
+    "repair_calls": 0,
+    "repaired": 0,
+    "unrecoverable": 0,
+    "wasted_llm_calls": 0,   # calls whose output had to be thrown away
+}
+
+
+SYSTEM_PROMPT = """
 You are a Senior Indian Litigation and Defence Lawyer.
 
 You are analyzing a legal notice / judgment / order for the purpose of
@@ -135,33 +141,322 @@ ANALYSIS RULES
 """
 
 
+# ===================== USAGE / COST =====================
+
+def _new_usage(mode: str):
+    return {"mode": mode, "llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+
+def _record_usage(usage: dict, token_usage):
+    if token_usage is not None:
+        usage["prompt_tokens"] += token_usage.prompt_tokens or 0
+        usage["completion_tokens"] += token_usage.completion_tokens or 0
+
+
+def _finalize_cost(usage: dict):
+    price_in, price_out = MODEL_PRICING.get(MODEL_NAME, (0.0, 0.0))
+    usage["model"] = MODEL_NAME
+    usage["estimated_usd"] = round(
+        usage["prompt_tokens"] / 1e6 * price_in + usage["completion_tokens"] / 1e6 * price_out, 6
+    )
+    return usage
+
+
+# ===================== SINGLE LLM PASS =====================
+
+def _validate(obj) -> dict:
+    """Schema validation; returns the normalized dict or raises ValidationError."""
+    return DocumentAnalysisResponse.model_validate(obj).model_dump()
+
+
+async def _repair(raw_output: str, error: Exception, usage: dict) -> dict:
+    """
+    Targeted repair: only the malformed output + the error go back to the
+    model (no document context), so this is much cheaper than a re-call.
+    """
+    structured_output_metrics["repair_calls"] += 1
+    usage["llm_calls"] += 1
+
+    response = await chat_completion(
+        model=MODEL_NAME,
+        messages=[
+            {"role": "system", "content": REPAIR_PROMPT},
+            {
+                "role": "user",
+                "content": (
+                    f"SCHEMA:\n{json.dumps(ANALYSIS_SCHEMA)}\n\n"
+                    f"ERROR:\n{str(error)[:2000]}\n\n"
+                    f"INPUT:\n{raw_output}"
+                )
+            }
+        ],
+        response_format=RESPONSE_FORMAT,
+        timeout=ANALYSIS_TIMEOUT
+    )
+    _record_usage(usage, getattr(response, "usage", None))
+
+    parser = IncrementalJSONObjectParser()
+    parser.feed(response.choices[0].message.content or "")
+    return _validate(parser.close())
+
+
+async def _analyze_context(context: str, usage: dict, label: str = "DOCUMENT CONTENT"):
+    """
+    One structured analysis call over `context`.
+    The streamed output is parsed incrementally and validated against
+    DocumentAnalysisResponse; a malformed result gets one repair attempt.
+    """
+    structured_output_metrics["calls"] += 1
+    usage["llm_calls"] += 1
+    parser = IncrementalJSONObjectParser()
+
+    try:
+        async for delta in stream_chat_completion(
+            model=MODEL_NAME,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": f"{label}:\n{context}"}
+            ],
+            response_format=RESPONSE_FORMAT,
+            timeout=ANALYSIS_TIMEOUT,
+            on_usage=lambda token_usage: _record_usage(usage, token_usage)
+        ):
+            parser.feed(delta)
+    except Exception as e:
+        print("LLM call failed:", e)
+        raise ValueError(f"LLM call failed: {e}")
+
+    try:
+        return _validate(parser.close())
+    except (ValueError, ValidationError) as e:
+        structured_output_metrics["malformed"] += 1
+        print("Malformed analysis output, repairing:", e)
+        parse_error = e
+
+    try:
+        result = await _repair(parser.raw, parse_error, usage)
+        structured_output_metrics["repaired"] += 1
+        # The original call's output was discarded
+        structured_output_metrics["wasted_llm_calls"] += 1
+        return result
+    except Exception as repair_error:
+        structured_output_metrics["unrecoverable"] += 1
+        structured_output_metrics["wasted_llm_calls"] += 2
+        raise ValueError(f"AI output not valid JSON: {repair_error}")
+
+
+# ===================== MAP-REDUCE (LONG DOCUMENTS) =====================
+
+def split_sections(text: str, max_chars: int = MAX_LLM_CHARS):
+    """Paragraph-aligned sections of at most max_chars (long paragraphs are cut)."""
+    sections, current = [], ""
+    for para in re.split(r"\n\s*\n|\n", text):
+        para = para.strip()
+        if not para:
+            continue
+        while len(para) > max_chars:
+            if current:
+                sections.append(current)
+                current = ""
+            sections.append(para[:max_chars])
+            para = para[max_chars:]
+        if current and len(current) + len(para) + 1 > max_chars:
+            sections.append(current)
+            current = ""
+        current = f"{current}\n{para}" if current else para
+    if current:
+        sections.append(current)
+    return sections
+
+
+def plan_sections(text: str, max_sections: int = MAX_ANALYSIS_SECTIONS):
+    """
+    RETURNS: (sections to analyse, number of sections before sampling)
+    The sample always keeps the first section (parties, demand) and the
+    last one (operative part / signature).
+    """
+    max_sections = max(1, max_sections)
+    section_chars = min(MAX_SECTION_CHARS, max(MAX_LLM_CHARS, -(-len(text) // max_sections)))
+    sections = split_sections(text, section_chars)
+    if len(sections) <= max_sections:
+        return sections, len(sections)
+
+    step = (len(sections) - 1) / max(max_sections - 1, 1)
+    picked = sorted({round(i * step) for i in range(max_sections)})
+    return [sections[i] for i in picked], len(sections)
+
+
+def _dedupe(items):
+    seen, out = set(), []
+    for item in items:
+        if not isinstance(item, str) or not item.strip():
+            continue
+        norm = re.sub(r"[^a-z0-9]+", " ", item.lower()).strip()
+        if norm and norm not in seen:
+            seen.add(norm)
+            out.append(item.strip())
+    return out
+
+
+def _merge_flag(values, dominant):
+    """`dominant` if any section says so, else the other bool if any, else None."""
+    values = [v for v in values if isinstance(v, bool)]
+    if dominant in values:
+        return dominant
+    return values[0] if values else None
+
+
+def merge_analyses(partials: list) -> dict:
+    """Combines per-section JSON results into one document-level result."""
+    meta_fields = [
+        "document_title", "document_type", "issuing_authority_or_court", "addressed_to"
+    ]
+    metas = [p.get("document_metadata") or {} for p in partials]
+    legalities = [p.get("legality_assessment") or {} for p in partials]
+
+    metadata = {
+        field: next((m.get(field) for m in metas if m.get(field)), None)
+        for field in meta_fields
+    }
+    metadata["primary_parties"] = {
+        role: next(
+            ((m.get("primary_parties") or {}).get(role) for m in metas
+             if (m.get("primary_parties") or {}).get(role)),
+            None
+        )
+        for role in ("client_or_noticee", "opposite_party_or_notifier")
+    }
+    metadata["other_parties_involved"] = _dedupe(
+        x for m in metas for x in m.get("other_parties_involved") or []
+    )
+
+    risks = [str(l.get("overall_risk_level", "")).lower() for l in legalities]
+    risks = [r for r in risks if r in RISK_ORDER]
+
+    precedents, seen_cases = [], set()
+    for p in partials:
+        for case in p.get("relevant_judicial_precedents") or []:
+            name = re.sub(r"[^a-z0-9]+", " ", str(case.get("case_name", "")).lower()).strip()
+            if name and name not in seen_cases:
+                seen_cases.add(name)
+                precedents.append(case)
+
+    return {
+        "document_metadata": metadata,
+        "key_points_summary": _dedupe(x for p in partials for x in p.get("key_points_summary") or []),
+        "defence_preparation_checklist": _dedupe(
+            x for p in partials for x in p.get("defence_preparation_checklist") or []
+        ),
+        "legality_assessment": {
+            "is_notice_legally_valid": _merge_flag(
+                [l.get("is_notice_legally_valid") for l in legalities], dominant=False
+            ),
+            "authority_error_possible": _merge_flag(
+                [l.get("authority_error_possible") for l in legalities], dominant=True
+            ),
+            "party_non_compliance_possible": _merge_flag(
+                [l.get("party_non_compliance_possible") for l in legalities], dominant=True
+            ),
+            "identified_issues_or_defects": _dedupe(
+                x for l in legalities for x in l.get("identified_issues_or_defects") or []
+            ),
+            "overall_risk_level": max(risks, key=RISK_ORDER.get) if risks else "medium",
+        },
+        "relevant_judicial_precedents": precedents,
+    }
+
+
+async def _analyze_hierarchical(document_text: str, usage: dict, parallelism: int):
+    sections, total_sections = plan_sections(document_text)
+    usage["sections"] = len(sections)
+    if total_sections > len(sections):
+        usage["sampled_from_sections"] = total_sections
+        print(f"⚠️ Long document: analysing {len(sections)} of {total_sections} sections")
+    semaphore = asyncio.Semaphore(max(1, parallelism))
+
+    async def analyze_section(i, section):
+        async with semaphore:
+            try:
+                return await _analyze_context(
+                    section, usage, label=f"DOCUMENT CONTENT (section {i + 1} of {len(sections)})"
+                )
+            except Exception as e:
+                print(f"Section {i + 1} analysis failed:", e)
+                return None
+
+    partials = await asyncio.gather(*(analyze_section(i, s) for i, s in enumerate(sections)))
+    partials = [p for p in partials if isinstance(p, dict)]
+    if not partials:
+        raise ValueError("All section analyses failed")
+
+    usage["failed_sections"] = len(sections) - len(partials)
+    return _validate(merge_analyses(partials))
+
+
+# ===================== ENTRY POINT =====================
+
+async def analyze_legal_document(
+    document_text: str,
+    doc_hash: str = None,
+    mode: str = "auto",
+    parallelism: int = None
+):
+    """
+    Legal analysis of an uploaded document.
+
+    - mode="rag": embedded-chunk retrieval (RAG) over the first part of the
+      document; if doc_hash is provided, retrieves only from that document's index
+    - mode="hierarchical": split into sections, analyse them concurrently
+      (`parallelism` at a time), merge with de-duplication
+    - mode="auto": hierarchical above LONG_DOC_CHARS, otherwise rag
+
+    The result carries "analysis_cost" (LLM calls, tokens, estimated USD).
+    """
+    if mode == "auto":
+        mode = "hierarchical" if len(document_text) > LONG_DOC_CHARS else "rag"
+    usage = _new_usage(mode)
+
+    try:
+        if mode == "hierarchical":
+            result = await _analyze_hierarchical(
+                document_text, usage, parallelism or ANALYSIS_PARALLELISM
+            )
+            result["analysis_cost"] = _finalize_cost(usage)
+            return result
+
         # -----------------------------
-        # 3️⃣ LLM CALL
+        # 1️⃣ RAG: Retrieve top-k relevant chunks
         # -----------------------------
-        try:
-            response = await asyncio.to_thread(
-                client.chat.completions.create,
-                model=MODEL_NAME,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"DOCUMENT CONTENT:\n{context}"}
-                ],
+        query_text = document_text[:1000]  # initial slice for embedding query
+        retrieved_chunks = []
+
+        # ✅ Only use RAG if document has meaningful text
+        if len(document_text.strip()) > 200:
+            retrieved_chunks = await run_query_job(
+                retrieve_top_k_chunks,
+                query=query_text,
+                k=5,
+                doc_hash=doc_hash  # now per-file retrieval
             )
-            raw_output = response.choices[0].message.content.strip()
-        except Exception as e:
-            print("LLM call failed:", e)
-            raise ValueError(f"LLM call failed: {e}")
+
+        context = "\n\n".join(retrieved_chunks)
+
+        if not context.strip():
+            context = document_text[:3000]
+
+        if len(context) > MAX_LLM_CHARS:
+            context = context[:MAX_LLM_CHARS]  # trim for LLM
+
+        if not context.strip():
+            # fallback to first 3k chars
+            context = document_text[:3000]
 
         # -----------------------------
-        # 4️⃣ Parse JSON safely
+        # 2️⃣ LLM CALL + JSON PARSE
         # -----------------------------
-        try:
-            return json.loads(raw_output)
-        except json.JSONDecodeError:
-            match = re.search(r"\{.*\}", raw_output, re.DOTALL)
-            if not match:
-                raise ValueError("AI output not valid JSON")
-            return json.loads(match.group())
+        result = await _analyze_context(context, usage)
+        result["analysis_cost"] = _finalize_cost(usage)
+        return result
 
     except Exception as e:
         print("Document analysis failed:", e)
@@ -1,8 +1,4 @@
-from docx import Document
-from docx.shared import Pt, Inches, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH
 from io import BytesIO
-from xhtml2pdf import pisa
 import markdown
 import re
 
@@ -10,6 +6,11 @@ def export_to_word(markdown_text: str):
     """
     Converts Markdown to a clean, professional Word Doc.
     """
+    # Imported here: python-docx is only needed by this endpoint
+    from docx import Document
+    from docx.shared import Pt, Inches, RGBColor
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
     doc = Document()
     
     # 1. Set Default Legal Font (Times New Roman)
@@ -75,6 +76,9 @@ def export_to_pdf(markdown_text: str):
     Converts Markdown -> HTML -> PDF.
     Fixed CSS to prevent 'NotImplementedType' crash.
     """
+    # Imported here: xhtml2pdf (reportlab) is only needed by this endpoint
+    from xhtml2pdf import pisa
+
     html_body = markdown.markdown(markdown_text)
     
     result = BytesIO()
@@ -0,0 +1,95 @@
+# ingestion.py
+# Upload → parse/OCR → embed → analyse → enrich
+# Shared by the inline /analyze-document endpoint and background jobs.
+
+import asyncio
+from functools import partial
+from fastapi.encoders import jsonable_encoder
+
+from app.services.document_intelligence import analyze_legal_document
+from app.services.scraper import scrape_legal_context_async
+from app.utils.file_handler import extract_document
+from app.utils.chunk_and_index import build_index_from_text
+from app.utils.embedding_pool import run_embedding_job
+
+
+class IngestionError(ValueError):
+    """The upload itself is unusable (maps to HTTP 400)."""
+
+
+def _no_report(stage, done=None, total=None):
+    pass
+
+
+def extraction_report(pages):
+    """Per-page provenance + timings, with totals."""
+    return {
+        "total_pages": len(pages),
+        "ocr_pages": sum(1 for p in pages if p["source"] == "ocr"),
+        "seconds": round(sum(p["seconds"] for p in pages), 3),
+        "pages": pages,
+    }
+
+
+async def analyze_upload(raw_bytes: bytes, filename: str, report=None, executor=None):
+    """
+    Full document analysis pipeline.
+
+    - report(stage, done, total) receives progress for
+      parse / ocr / embed / analyze / enrich
+    - executor runs blocking parse/OCR work (None → default pool)
+    """
+    report = report or _no_report
+    loop = asyncio.get_running_loop()
+
+    # 1️⃣ Parse ONCE (OCR pages reported as they finish)
+    report("parse")
+    document_text, pages = await loop.run_in_executor(
+        executor,
+        partial(
+            extract_document,
+            raw_bytes,
+            filename,
+            progress=lambda done, total: report("ocr", done, total)
+        )
+    )
+    clean_text = document_text.replace("\x00", "").strip()
+
+    if len(clean_text) < 50:
+        raise IngestionError("This PDF cannot be read programmatically.")
+
+    # 2️⃣ Index DIRECTLY from TEXT
+    report("embed")
+    doc_hash = await run_embedding_job(
+        build_index_from_text,
+        clean_text,
+        source_name=filename,
+        progress=lambda done, total: report("embed", done, total)
+    )
+
+    if not doc_hash:
+        raise IngestionError("Indexing failed: empty document.")
+
+    # 3️⃣ LLM analysis (doc_hash aware)
+    report("analyze")
+    analysis_model = await analyze_legal_document(
+        clean_text,
+        doc_hash=doc_hash
+    )
+    analysis = jsonable_encoder(analysis_model)
+
+    # 4️⃣ Optional enrichment (never crash)
+    report("enrich")
+    try:
+        scraped = await scrape_legal_context_async(clean_text[:150], "generic")
+        if isinstance(scraped, list):
+            analysis.setdefault("relevant_judicial_precedents", [])
+            analysis["relevant_judicial_precedents"].extend(scraped)
+    except Exception:
+        pass
+
+    return {
+        **analysis,
+        "doc_hash": doc_hash,
+        "extraction": extraction_report(pages)
+    }
@@ -0,0 +1,199 @@
+# job_queue.py
+# Background jobs for long-running document ingestion
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+JOBS_DB_PATH = os.path.join(BASE_DIR, "index_data", "_jobs.sqlite")
+
+# Max ingestion jobs running at once; the rest wait as "queued".
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# Finished / failed rows are deleted once untouched for this long (seconds)
+JOB_TTL = int(os.getenv("JOB_TTL", str(7 * 24 * 3600)))
+
+STAGES = ["parse", "ocr", "embed", "analyze", "enrich"]
+
+
+class JobStore:
+    """SQLite-backed job records (visible to every uvicorn worker)."""
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " stage TEXT,"
+            " progress TEXT,"
+            " result TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " owner INTEGER,"
+            " error_type TEXT)"
+        )
+        # Databases created before owner / error_type existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, decl in (("owner", "INTEGER"), ("error_type", "TEXT")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {decl}")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def create(self, kind: str) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._delete_expired(now)
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, progress, created_at, updated_at, owner) "
+                "VALUES (?, ?, 'queued', '{}', ?, ?, ?)",
+                (job_id, kind, now, now, os.getpid())
+            )
+            self._conn.commit()
+        return job_id
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        for key in ("progress", "result"):
+            if key in fields:
+                fields[key] = json.dumps(fields[key])
+        columns = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ?",
+                (*fields.values(), job_id)
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, stage, progress, result, error, created_at, updated_at, error_type "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "stage": row[3],
+            "progress": json.loads(row[4] or "{}"),
+            "result": json.loads(row[5]) if row[5] else None,
+            "error": row[6],
+            "created_at": row[7],
+            "updated_at": row[8],
+            "error_type": row[9],
+        }
+
+    def purge_expired(self) -> int:
+        """Delete done/failed jobs older than JOB_TTL. Called at startup."""
+        with self._lock:
+            deleted = self._delete_expired(time.time())
+            self._conn.commit()
+        return deleted
+
+    def _delete_expired(self, now: float) -> int:
+        # Caller holds self._lock and commits
+        return self._conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+            (now - JOB_TTL,)
+        ).rowcount
+
+    def fail_orphans(self) -> int:
+        """
+        Jobs run as tasks inside the API process that queued them. After a
+        restart (or --reload) queued/running rows whose process is gone
+        can never finish: mark them failed. Called once at startup.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, owner FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+            orphans = [job_id for job_id, owner in rows if not _process_alive(owner)]
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'failed', error = 'interrupted by restart', "
+                "error_type = 'Interrupted', updated_at = ? "
+                "WHERE id = ? AND status IN ('queued', 'running')",
+                [(now, job_id) for job_id in orphans]
+            )
+            self._conn.commit()
+        return len(orphans)
+
+
+def _process_alive(pid) -> bool:
+    # This process has only just started: none of its jobs exist yet
+    if not pid or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    Runs job coroutines on the API event loop, at most JOB_WORKERS at a time.
+    Blocking parse/OCR work goes to a dedicated executor so heavy uploads
+    never occupy the threads used by /draft/generate.
+    """
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS):
+        self.store = store
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._workers = workers
+        self._semaphore = None
+        self._tasks = set()
+
+    def reporter(self, job_id: str):
+        """report(stage, done, total) → persisted progress for job_id."""
+        def report(stage, done=None, total=None):
+            progress = {"stage_index": STAGES.index(stage) + 1, "stages": len(STAGES)}
+            if total:
+                progress.update({"done": done, "total": total})
+            self.store.update(job_id, stage=stage, progress=progress)
+        return report
+
+    def submit(self, kind: str, job_fn) -> str:
+        """
+        job_fn(report, executor) → awaitable returning a JSON-able result.
+        Returns the job id immediately.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._workers)
+
+        job_id = self.store.create(kind)
+        task = asyncio.create_task(self._run(job_id, job_fn))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job_id
+
+    async def _run(self, job_id: str, job_fn):
+        async with self._semaphore:
+            self.store.update(job_id, status="running")
+            try:
+                result = await job_fn(self.reporter(job_id), self.executor)
+                self.store.update(job_id, status="done", result=result)
+            except Exception as e:
+                print(f"Job {job_id} failed:", e)
+                self.store.update(job_id, status="failed", error=str(e), error_type=type(e).__name__)
+
+
+job_queue = JobQueue(JobStore())
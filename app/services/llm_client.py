@@ -0,0 +1,78 @@
+# llm_client.py
+# Shared async OpenAI client (one connection pool per worker process)
+
+import os
+import asyncio
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+load_dotenv()
+
+# Max LLM calls in flight per process; excess calls wait instead of piling
+# more sockets onto the API.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_CONNECT_TIMEOUT = 10.0
+
+_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=LLM_MAX_CONCURRENCY,
+        max_keepalive_connections=LLM_MAX_CONCURRENCY,
+        keepalive_expiry=60
+    ),
+    timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+)
+
+# OPENAI_BASE_URL (e.g. a local mock server) is honoured by the SDK itself
+client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    http_client=_http_client,
+    max_retries=2
+)
+
+_semaphore = None
+
+
+def _get_semaphore():
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def chat_completion(timeout: float = None, **kwargs):
+    """
+    client.chat.completions.create without blocking the event loop.
+    `timeout` (seconds) overrides LLM_TIMEOUT for this call.
+    """
+    async with _get_semaphore():
+        return await client.chat.completions.create(
+            timeout=timeout or LLM_TIMEOUT,
+            **kwargs
+        )
+
+
+async def stream_chat_completion(timeout: float = None, on_usage=None, **kwargs):
+    """
+    Streaming chat completion; yields content deltas as they arrive.
+    The concurrency slot is held until the stream is fully consumed.
+    on_usage(usage) receives token usage from the final chunk, if given.
+    """
+    if on_usage is not None:
+        kwargs["stream_options"] = {"include_usage": True}
+
+    async with _get_semaphore():
+        stream = await client.chat.completions.create(
+            timeout=timeout or LLM_TIMEOUT,
+            stream=True,
+            **kwargs
+        )
+        try:
+            async for chunk in stream:
+                if on_usage is not None and getattr(chunk, "usage", None):
+                    on_usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
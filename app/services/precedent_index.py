@@ -0,0 +1,295 @@
+# precedent_index.py
+# Local precedent corpus (scraped judgments / circulars)
+#
+# BM25 + Legal-BERT hybrid over pages we already fetched once, so common
+# research queries (Section 16(4), ITC, DRC-01A ...) are answered offline.
+#
+# index_data/_precedents/
+#   precedents.json → [{url, case_name, court, text, added_at}, ...]
+#   vectors.npy     → normalized embeddings, row i = precedent i
+#   deltas/*.npz    → write-backs since the last compaction (entries + vectors)
+#
+# Every worker appends its own delta file and picks up the others' on the
+# next search. Once PRECEDENT_COMPACT_DELTAS deltas exist they are folded
+# into the base files under a cross-process file lock.
+#
+# Seeding from the scraper's page cache:
+#     python -m app.services.precedent_index import-cache
+
+import os
+import sys
+import json
+import time
+import threading
+import numpy as np
+from filelock import FileLock
+
+from app.utils.bm25 import BM25Index, reciprocal_rank_fusion
+from app.utils.legal_embeddings import embed_texts
+from app.utils.query_batcher import embed_query
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+PRECEDENT_DIR = os.path.join(BASE_DIR, "index_data", "_precedents")
+
+# A local hit must contain at least this share of the query terms ...
+PRECEDENT_MIN_COVERAGE = float(os.getenv("PRECEDENT_MIN_COVERAGE", "0.3"))
+# ... and at least this many hits are needed to skip the live scrape
+PRECEDENT_MIN_HITS = int(os.getenv("PRECEDENT_MIN_HITS", "2"))
+CANDIDATES = 20
+
+# Delta files before they are merged into precedents.json / vectors.npy
+PRECEDENT_COMPACT_DELTAS = int(os.getenv("PRECEDENT_COMPACT_DELTAS", "50"))
+
+
+def _tmp_path(path: str) -> str:
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+class PrecedentIndex:
+    """
+    search(query, k) → precedents ranked by reciprocal-rank fusion of
+    BM25 and dense similarity; add_many(entries) writes new pages back.
+    """
+
+    def __init__(self, root: str = PRECEDENT_DIR):
+        self.root = root
+        self._lock = threading.RLock()
+        self._entries = None
+        self._vectors = None
+        self._bm25 = None          # full build only on first search / base reload
+        self._base_mtime = None
+        self._deltas = []          # delta file names already merged in memory
+        self.local_hits = 0
+        self.live_fallbacks = 0
+
+    # ---------- paths ----------
+
+    def _meta_path(self):
+        return os.path.join(self.root, "precedents.json")
+
+    def _vec_path(self):
+        return os.path.join(self.root, "vectors.npy")
+
+    def _delta_dir(self):
+        return os.path.join(self.root, "deltas")
+
+    def _write_lock(self):
+        os.makedirs(self.root, exist_ok=True)
+        return FileLock(os.path.join(self.root, "precedents.lock"))
+
+    @staticmethod
+    def _doc_texts(entries):
+        return [f"{e['case_name']}\n{e['text']}" for e in entries]
+
+    # ---------- load ----------
+
+    def _append(self, entries, vectors):
+        """Adds entries whose url is not known yet (deltas may overlap the base)."""
+        known = {e["url"] for e in self._entries}
+        keep = [i for i, e in enumerate(entries) if e["url"] not in known]
+        if not keep:
+            return
+        vectors = vectors[keep]
+        added = [entries[i] for i in keep]
+        self._entries.extend(added)
+        self._vectors = vectors if self._vectors is None else np.vstack([self._vectors, vectors])
+        # Write-backs only index the new pages; an unbuilt index stays
+        # unbuilt until the next search needs it
+        if self._bm25 is not None:
+            self._bm25 = self._bm25.extend(self._doc_texts(added))
+
+    def _refresh(self):
+        """Picks up compactions and other workers' deltas. Caller holds _lock."""
+        meta_path, vec_path = self._meta_path(), self._vec_path()
+        mtime = os.stat(meta_path).st_mtime_ns if os.path.exists(meta_path) else None
+
+        if self._entries is None or mtime != self._base_mtime:
+            if mtime is not None and os.path.exists(vec_path):
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+                self._vectors = np.load(vec_path)
+            else:
+                self._entries, self._vectors = [], None
+            self._base_mtime = mtime
+            self._deltas = []
+            self._bm25 = None
+
+        delta_dir = self._delta_dir()
+        if os.path.isdir(delta_dir):
+            loaded = set(self._deltas)
+            for name in sorted(os.listdir(delta_dir)):
+                if not name.endswith(".npz") or name in loaded:
+                    continue
+                try:
+                    with np.load(os.path.join(delta_dir, name)) as data:
+                        entries = json.loads(str(data["entries"]))
+                        vectors = data["vectors"]
+                except (OSError, ValueError, KeyError):
+                    continue  # compacted away meanwhile; the base has it
+                self._append(entries, vectors)
+                self._deltas.append(name)
+
+    def _load(self):
+        self._refresh()
+        if self._bm25 is None:
+            self._bm25 = BM25Index.build(self._doc_texts(self._entries))
+
+    # ---------- write ----------
+
+    def _write_delta(self, entries, vectors):
+        os.makedirs(self._delta_dir(), exist_ok=True)
+        name = f"{time.time_ns()}-{os.getpid()}-{threading.get_ident()}.npz"
+        path = os.path.join(self._delta_dir(), name)
+        tmp = _tmp_path(path)
+        with open(tmp, "wb") as f:
+            np.savez(f, entries=np.array(json.dumps(entries, ensure_ascii=False)), vectors=vectors)
+        os.replace(tmp, path)
+        return name
+
+    def _compact(self):
+        """Deltas → base files. Caller holds both locks after a _refresh."""
+        meta_path, vec_path = self._meta_path(), self._vec_path()
+
+        vec_tmp, meta_tmp = _tmp_path(vec_path), _tmp_path(meta_path)
+        with open(vec_tmp, "wb") as f:
+            np.save(f, self._vectors)
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(vec_tmp, vec_path)
+        os.replace(meta_tmp, meta_path)
+
+        for name in self._deltas:
+            try:
+                os.remove(os.path.join(self._delta_dir(), name))
+            except OSError:
+                pass
+        self._base_mtime = os.stat(meta_path).st_mtime_ns
+        self._deltas = []
+
+    def add_many(self, entries):
+        """
+        entries: [{url, case_name, court, text}, ...]. Known urls are skipped.
+        Costs one embedding pass over the new pages and one delta file.
+        RETURNS: number of precedents added.
+        """
+        with self._lock:
+            self._refresh()
+            known = {e["url"] for e in self._entries}
+
+        new = []
+        for e in entries:
+            if e.get("url") and e["url"] not in known and e.get("text", "").strip():
+                known.add(e["url"])
+                new.append({
+                    "url": e["url"],
+                    "case_name": e.get("case_name") or "Unnamed Case",
+                    "court": e.get("court"),
+                    "text": e["text"],
+                    "added_at": time.time(),
+                })
+        if not new:
+            return 0
+
+        # Embed outside the locks: searches and other writers keep going
+        vectors = np.asarray(embed_texts(self._doc_texts(new)), dtype="float32")
+
+        with self._lock, self._write_lock():
+            self._refresh()  # other workers may have added some of these meanwhile
+            known = {e["url"] for e in self._entries}
+            keep = [i for i, e in enumerate(new) if e["url"] not in known]
+            if not keep:
+                return 0
+            new, vectors = [new[i] for i in keep], vectors[keep]
+
+            self._deltas.append(self._write_delta(new, vectors))
+            self._append(new, vectors)
+            if len(self._deltas) >= PRECEDENT_COMPACT_DELTAS:
+                self._compact()
+            return len(new)
+
+    # ---------- read ----------
+
+    def search(self, query: str, k: int = 3):
+        """
+        RETURNS: [{url, case_name, court, text, score}, ...] restricted to
+        precedents covering at least PRECEDENT_MIN_COVERAGE of the query terms.
+        """
+        with self._lock:
+            self._load()
+            if not self._entries:
+                return []
+
+            coverage = self._bm25.coverage(query)
+            eligible = np.flatnonzero(coverage >= PRECEDENT_MIN_COVERAGE)
+            if len(eligible) == 0:
+                return []
+
+            lexical = [
+                i for i, _ in self._bm25.top_k(query, k=CANDIDATES)
+                if coverage[i] >= PRECEDENT_MIN_COVERAGE
+            ]
+            entries, vectors = self._entries, self._vectors[eligible]
+
+        # Embed outside the lock: write-backs must not wait on a forward pass
+        sims = vectors @ embed_query(query)
+        dense = eligible[np.argsort(-sims)[:CANDIDATES]].tolist()
+
+        return [
+            {**entries[i], "score": score}
+            for i, score in reciprocal_rank_fusion([lexical, dense])[:k]
+        ]
+
+    def record(self, local: bool):
+        if local:
+            self.local_hits += 1
+        else:
+            self.live_fallbacks += 1
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            total = self.local_hits + self.live_fallbacks
+            return {
+                "precedents": len(self._entries),
+                "pending_deltas": len(self._deltas),
+                "local_hits": self.local_hits,
+                "live_fallbacks": self.live_fallbacks,
+                "local_ratio": round(self.local_hits / total, 3) if total else 0.0,
+            }
+
+
+precedent_index = PrecedentIndex()
+
+
+# ===================== SEEDING =====================
+
+def import_page_cache(index: PrecedentIndex = None):
+    """Adds every trusted page already sitting in the scraper's page cache."""
+    from app.services.scraper import PAGE_CACHE_DIR, page_fetcher, _parse_case
+
+    index = index or precedent_index
+    entries = []
+    if os.path.exists(PAGE_CACHE_DIR):
+        for name in sorted(os.listdir(PAGE_CACHE_DIR)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(PAGE_CACHE_DIR, name), "r", encoding="utf-8") as f:
+                    page = json.load(f)
+                if not page_fetcher.is_allowed(page["url"]):
+                    continue
+                case, text = _parse_case(page["body"], "")
+                entries.append({**case, "url": page["url"], "text": text})
+            except Exception as e:
+                print(f"⚠️ {name}: {e}")
+
+    added = index.add_many(entries)
+    print(f"Imported {added} precedent(s) from {len(entries)} cached page(s)")
+    return added
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "import-cache":
+        import_page_cache()
+    else:
+        print("usage: python -m app.services.precedent_index import-cache")
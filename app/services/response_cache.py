@@ -0,0 +1,158 @@
+# response_cache.py
+# Persistent cache of LLM responses (generate / refine / suggest)
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+CACHE_PATH = os.path.join(BASE_DIR, "index_data", "_response_cache.sqlite")
+
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))   # seconds
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+
+# Optional near-duplicate tier: cosine threshold, unset/0 → disabled
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0") or 0)
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def make_key(model: str, temperature: float, messages) -> str:
+    """Exact key: model + temperature + whitespace-normalized messages."""
+    payload = json.dumps(
+        [model, temperature, [[m["role"], _normalize(m["content"])] for m in messages]],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def make_scope(*parts) -> str:
+    """Similarity scope: only entries sharing every part can match."""
+    payload = json.dumps([_normalize(str(p)) for p in parts], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    key → response text, with TTL and LRU eviction beyond `max_entries`.
+    Entries stored with a (scope, vector) pair can also be served to
+    near-duplicate requests in the same scope.
+    """
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        ttl: int = RESPONSE_CACHE_TTL,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        similarity: float = RESPONSE_CACHE_SIMILARITY
+    ):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " latency_ms REAL NOT NULL,"
+            " scope TEXT,"
+            " vector BLOB,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_scope ON responses (scope)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.saved_latency_ms = 0.0
+
+    @property
+    def similarity_enabled(self) -> bool:
+        return self.similarity > 0
+
+    def _served(self, key: str, latency_ms: float):
+        self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        self.saved_latency_ms += latency_ms
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, latency_ms FROM responses WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            self.hits += 1
+            self._served(key, row[1])
+            return row[0]
+
+    def get_similar(self, scope: str, vector: np.ndarray):
+        """Best same-scope entry with cosine ≥ threshold (vectors are normalized)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, response, latency_ms, vector FROM responses "
+                "WHERE scope = ? AND vector IS NOT NULL AND created_at > ?",
+                (scope, time.time() - self.ttl)
+            ).fetchall()
+            if not rows:
+                return None
+
+            matrix = np.vstack([np.frombuffer(r[3], dtype="float32") for r in rows])
+            scores = matrix @ np.asarray(vector, dtype="float32")
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity:
+                return None
+
+            self.similar_hits += 1
+            self._served(rows[best][0], rows[best][2])
+            return rows[best][1]
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def put(self, key: str, response: str, latency_ms: float, scope: str = None, vector=None):
+        now = time.time()
+        blob = None if vector is None else np.asarray(vector, dtype="float32").tobytes()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, response, latency_ms, scope, vector, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, response, latency_ms, scope, blob, now, now)
+            )
+            self._conn.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            served = self.hits + self.similar_hits
+            total = served + self.misses
+            return {
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_ratio": round(served / total, 4) if total else 0.0,
+                "saved_latency_ms": round(self.saved_latency_ms, 1),
+            }
+
+
+response_cache = ResponseCache()
@@ -1,8 +1,44 @@
 # scraper.py
-import requests
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import threading
+import weakref
+from urllib.parse import urlparse
+
+import httpx
 from bs4 import BeautifulSoup
 from googlesearch import search
-import re
+
+from app.services.precedent_index import precedent_index, PRECEDENT_MIN_HITS
+from app.utils.embedding_pool import run_embedding_job, run_query_job
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+PAGE_CACHE_DIR = os.path.join(BASE_DIR, "index_data", "_page_cache")
+
+TRUSTED_DOMAINS = [
+    "indiankanoon.org",
+    "incometaxindia.gov.in",
+    "cbic.gov.in",
+    "mca.gov.in",
+    "rbi.org.in",
+    "ibbi.gov.in"
+]
+
+SCRAPE_DEADLINE = float(os.getenv("SCRAPE_DEADLINE", "8"))      # whole scrape, seconds
+FETCH_TIMEOUT = float(os.getenv("SCRAPE_FETCH_TIMEOUT", "6"))   # one page, seconds
+PER_DOMAIN_CONCURRENCY = int(os.getenv("SCRAPE_PER_DOMAIN", "2"))
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", str(24 * 3600)))  # fresh without revalidation
+PAGE_CACHE_MAX_AGE = int(os.getenv("PAGE_CACHE_MAX_AGE", str(30 * 24 * 3600)))  # unused this long → dropped
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MB", "128")) * 1024 * 1024
+PAGE_CACHE_EVICT_INTERVAL = 60  # seconds between directory scans
+MAX_RESULTS = 3
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
 
 def extract_case_from_text(text: str):
     """
@@ -20,60 +56,322 @@ def extract_case_from_text(text: str):
     return None
 
 
-def scrape_legal_context(query: str, template_type: str):
-    # print(f"🕵️ Searching Trusted Sources for: {query}")
+# ===================== PAGE CACHE =====================
+
+class PageCache:
+    """
+    On-disk HTTP page cache.
+    Entries younger than `ttl` are served as-is; older ones are revalidated
+    with ETag / Last-Modified (a 304 reuses the stored body).
+    Entries unused for `max_age` are deleted, then least-recently-used ones
+    while the directory exceeds `max_bytes` (hits refresh the file mtime).
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = PAGE_CACHE_DIR,
+        ttl: int = PAGE_CACHE_TTL,
+        max_age: int = PAGE_CACHE_MAX_AGE,
+        max_bytes: int = PAGE_CACHE_MAX_BYTES
+    ):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._last_evict = 0.0
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url: str):
+        path = self._path(url)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def put(self, url: str, body: str, etag: str = None, last_modified: str = None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {
+            "url": url,
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        path = self._path(url)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+        if time.time() - self._last_evict > PAGE_CACHE_EVICT_INTERVAL:
+            self._evict()
+        return entry
+
+    def _evict(self):
+        self._last_evict = now = time.time()
+        entries, total = [], 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if now - st.st_mtime > self.max_age:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+# ===================== FETCHER =====================
+
+class PageFetcher:
+    """
+    Concurrent page fetcher:
+    - one pooled httpx client per event loop
+    - at most `per_domain` requests in flight per host
+    - per-page timeout + overall deadline for a batch
+    - only hosts in `allowed_domains` are fetched
+    """
+
+    def __init__(
+        self,
+        allowed_domains=TRUSTED_DOMAINS,
+        cache: PageCache = None,
+        per_domain: int = PER_DOMAIN_CONCURRENCY,
+        fetch_timeout: float = FETCH_TIMEOUT
+    ):
+        self.allowed_domains = list(allowed_domains)
+        self.cache = cache or PageCache()
+        self.per_domain = per_domain
+        self.fetch_timeout = fetch_timeout
+        # loop → (client, {host: semaphore}); entries vanish with their loop
+        self._per_loop = weakref.WeakKeyDictionary()
+
+    def is_allowed(self, url: str) -> bool:
+        host = (urlparse(url).hostname or "").lower()
+        return any(host == d or host.endswith("." + d) for d in self.allowed_domains)
+
+    def _loop_state(self):
+        """
+        Client + domain semaphores of the running loop. Each loop keeps its
+        own, so a loop in another thread never sees its pool closed under it.
+        """
+        loop = asyncio.get_running_loop()
+        state = self._per_loop.get(loop)
+        if state is None:
+            client = httpx.AsyncClient(
+                headers=HEADERS,
+                follow_redirects=True,
+                timeout=httpx.Timeout(self.fetch_timeout),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+            state = self._per_loop[loop] = (client, {})
+        return state
+
+    async def aclose(self):
+        """Closes the running loop's client. Call before that loop shuts down."""
+        state = self._per_loop.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state[0].aclose()
+
+    def _domain_limit(self, url: str):
+        host = urlparse(url).hostname or ""
+        limits = self._loop_state()[1]
+        if host not in limits:
+            limits[host] = asyncio.Semaphore(self.per_domain)
+        return limits[host]
+
+    async def fetch(self, url: str):
+        """RETURNS: page body (str) or None."""
+        # Cache reads/writes touch disk (and may evict): keep them off the loop
+        cached = await asyncio.to_thread(self.cache.get, url)
+        if cached and self.cache.is_fresh(cached):
+            return cached["body"]
+
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        client = self._loop_state()[0]
+        async with self._domain_limit(url):
+            resp = await client.get(url, headers=headers)
+
+        if resp.status_code == 304 and cached:
+            await asyncio.to_thread(
+                self.cache.put, url, cached["body"], cached.get("etag"), cached.get("last_modified")
+            )
+            return cached["body"]
+        if resp.status_code != 200:
+            return None
+
+        await asyncio.to_thread(
+            self.cache.put, url, resp.text, resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+        )
+        return resp.text
+
+    async def fetch_many(self, urls, deadline: float = SCRAPE_DEADLINE):
+        """
+        Fetches allowed urls concurrently until `deadline` seconds elapse.
+        RETURNS: {url: body} for pages that arrived in time.
+        """
+        urls = [u for u in dict.fromkeys(urls) if self.is_allowed(u)]
+        if not urls:
+            return {}
 
-    trusted_domains = [
-        "indiankanoon.org",
-        "incometaxindia.gov.in",
-        "cbic.gov.in",
-        "mca.gov.in",
-        "rbi.org.in",
-        "ibbi.gov.in"
-    ]
+        tasks = {asyncio.create_task(self.fetch(u)): u for u in urls}
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+
+        pages = {}
+        for task in done:
+            url = tasks[task]
+            try:
+                body = task.result()
+            except Exception as e:
+                print(f"⚠️ Error scraping {url}: {e}")
+                continue
+            if body:
+                pages[url] = body
+        return pages
+
+
+page_fetcher = PageFetcher()
+
+
+# ===================== SCRAPER =====================
+
+def _case_result(case_name: str, query: str, court: str = None):
+    return {
+        "case_name": case_name,
+        "court": court or "Supreme Court / High Court",
+        "legal_principle": "See source",
+        "relevance_to_present_document": f"Relevant to: {query[:100]}"
+    }
+
+
+def _parse_case(html: str, query: str):
+    soup = BeautifulSoup(html, "html.parser")
+    case_name = soup.title.string.strip() if soup.title and soup.title.string else "Unnamed Case"
+    court_name = "Supreme Court / High Court"
+
+    # Grab first 5 paragraphs for content
+    paragraphs = [p.get_text(strip=True) for p in soup.find_all("p")]
+    text_content = " ".join(paragraphs[:5]) if paragraphs else case_name
+
+    # Even if short, include the case
+    return _case_result(case_name, query, court_name), text_content
+
+
+async def _search_local(query: str):
+    try:
+        return await run_query_job(precedent_index.search, query, k=MAX_RESULTS)
+    except Exception as e:
+        print("Precedent index error:", e)
+        return []
+
+
+async def _write_back(pages: list):
+    try:
+        added = await run_embedding_job(precedent_index.add_many, pages)
+        if added:
+            print(f"📚 Added {added} precedent(s) to local index")
+    except Exception as e:
+        print("Precedent index error:", e)
+
+
+# Write-backs run after the response; references keep the tasks alive
+_write_back_tasks = set()
+
+
+def _schedule_write_back(pages: list):
+    task = asyncio.create_task(_write_back(pages))
+    _write_back_tasks.add(task)
+    task.add_done_callback(_write_back_tasks.discard)
+
+
+async def scrape_legal_context_async(
+    query: str,
+    template_type: str,
+    deadline: float = SCRAPE_DEADLINE,
+    search_fn=None,
+    fetcher: PageFetcher = None,
+    use_local: bool = True
+):
+    """
+    Local precedent index first; live search → concurrent fetch (cached)
+    only when it has too few matches. Live pages are written back in
+    the background.
+    The live path is bounded by `deadline` seconds.
+    `search_fn(query) → urls` and `fetcher` can be swapped for tests.
+    """
+    if use_local:
+        local = await _search_local(query)
+        if len(local) >= PRECEDENT_MIN_HITS:
+            precedent_index.record(local=True)
+            return [_case_result(p["case_name"], query, p.get("court")) for p in local]
+        precedent_index.record(local=False)
+
+    fetcher = fetcher or page_fetcher
+    search_fn = search_fn or (lambda q: list(search(q, num_results=10)))
+    started = time.monotonic()
 
     safe_query = f"{query} Supreme Court High Court judgment India"
     results_list = []
+    fetched = []
 
     try:
-        results = search(safe_query, num_results=10)
+        urls = await asyncio.wait_for(asyncio.to_thread(search_fn, safe_query), timeout=deadline)
+        remaining = max(0.0, deadline - (time.monotonic() - started))
+        pages = await fetcher.fetch_many(urls, deadline=remaining)
 
-        for url in results:
-            if not any(domain in url for domain in trusted_domains):
+        # Keep search ranking order
+        for url in urls:
+            if url not in pages:
                 continue
-
             try:
-                headers = {"User-Agent": "Mozilla/5.0"}
-                resp = requests.get(url, headers=headers, timeout=15)
-                if resp.status_code != 200:
-                    continue
-
-                soup = BeautifulSoup(resp.text, "html.parser")
-                case_name = soup.title.string.strip() if soup.title else "Unnamed Case"
-                court_name = "Supreme Court / High Court"
-
-                # Grab first 5 paragraphs for content
-                paragraphs = [p.get_text(strip=True) for p in soup.find_all("p")]
-                text_content = " ".join(paragraphs[:5]) if paragraphs else case_name
-
-                # Even if short, include the case
-                results_list.append({
-                    "case_name": case_name,
-                    "court": court_name,
-                    "legal_principle": "See source",
-                    "relevance_to_present_document": f"Relevant to: {query[:100]}"
-                })
-
-                if len(results_list) >= 3:
-                    break
-
+                case, text_content = await asyncio.to_thread(_parse_case, pages[url], query)
+                results_list.append(case)
+                fetched.append({**case, "url": url, "text": text_content})
             except Exception as e:
                 print(f"⚠️ Error scraping {url}: {e}")
                 continue
 
+            if len(results_list) >= MAX_RESULTS:
+                break
+
     except Exception as e:
         print("Scraper error:", e)
 
+    if use_local and fetched:
+        _schedule_write_back(fetched)  # embedding + index write stay off the request path
+
     if not results_list:
         results_list.append({
             "case_name": "No relevant SC/HC case found",
@@ -82,5 +380,19 @@ def scrape_legal_context(query: str, template_type: str):
             "relevance_to_present_document": "Judicial precedents must be researched separately."
         })
 
-    # print("📝 Scraper results:", results_list)
     return results_list
+
+
+def scrape_legal_context(query: str, template_type: str):
+    """
+    Blocking wrapper for callers outside the event loop.
+    Each asyncio.run gets a fresh loop with its own client, closed
+    before that loop ends.
+    """
+    async def run():
+        try:
+            return await scrape_legal_context_async(query, template_type)
+        finally:
+            await page_fetcher.aclose()
+
+    return asyncio.run(run())
@@ -0,0 +1,169 @@
+# app/utils/bm25.py
+# Okapi BM25 over a small in-memory inverted index
+#
+# The tokenizer keeps statutory references intact so they match exactly:
+#     "Section 16(4)"  → ["section", "16(4)"]
+#     "DRC-01A"        → ["drc-01a"]
+#     "27AAPFU0939F1ZV" (GSTIN) → ["27aapfu0939f1zv"]
+
+import os
+import re
+import json
+import math
+import threading
+import numpy as np
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(
+    r"\d{2}[a-z]{5}\d{4}[a-z][a-z\d]z[a-z\d]"   # GSTIN
+    r"|\d+[a-z]?(?:\([a-z\d]+\))+"               # 16(4), 73(1)(a)
+    r"|[a-z]+-\d+[a-z]*"                         # drc-01a, gstr-3b
+    r"|[a-z\d]+"
+)
+
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or that the "
+    "this to was were which with under".split()
+)
+
+
+def tokenize(text: str):
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOP_WORDS]
+
+
+class BM25Index:
+    """
+    index = BM25Index.build(texts)
+    index.top_k("section 16(4) time limit", k=5) → [(doc_id, score), ...]
+    index.extend(more_texts) → new index with more docs appended
+    to_dict() / from_dict() round-trip through JSON.
+    """
+
+    def __init__(self, postings: dict, doc_lens: list):
+        # term → (doc_ids, term_freqs) as arrays, so scoring is vectorised
+        self.postings = {
+            t: (np.array([p[0] for p in plist], dtype="int64"),
+                np.array([p[1] for p in plist], dtype="float32"))
+            for t, plist in postings.items()
+        }
+        self.doc_lens = np.asarray(doc_lens, dtype="float32")
+        self.avgdl = float(self.doc_lens.mean()) if len(self.doc_lens) else 0.0
+
+    @staticmethod
+    def _count(texts, first_id: int = 0):
+        postings = {}
+        doc_lens = []
+        for doc_id, text in enumerate(texts, start=first_id):
+            tokens = tokenize(text)
+            doc_lens.append(len(tokens))
+            counts = {}
+            for t in tokens:
+                counts[t] = counts.get(t, 0) + 1
+            for t, tf in counts.items():
+                postings.setdefault(t, []).append([doc_id, tf])
+        return postings, doc_lens
+
+    @classmethod
+    def build(cls, texts):
+        return cls(*cls._count(texts))
+
+    def extend(self, texts):
+        """
+        Appends texts as doc ids len(self)... without re-tokenizing the
+        existing documents. Returns a new index; self is left untouched, so
+        readers holding it are unaffected.
+        """
+        added, added_lens = self._count(texts, first_id=len(self.doc_lens))
+        new = self.__class__({}, [])
+        new.postings = dict(self.postings)
+        for t, plist in self.__class__(added, []).postings.items():
+            if t in new.postings:
+                ids, tf = new.postings[t]
+                new.postings[t] = (np.concatenate([ids, plist[0]]), np.concatenate([tf, plist[1]]))
+            else:
+                new.postings[t] = plist
+        new.doc_lens = np.concatenate([self.doc_lens, np.asarray(added_lens, dtype="float32")])
+        new.avgdl = float(new.doc_lens.mean()) if len(new.doc_lens) else 0.0
+        return new
+
+    def __len__(self):
+        return len(self.doc_lens)
+
+    def scores(self, query: str) -> np.ndarray:
+        n = len(self.doc_lens)
+        scores = np.zeros(n, dtype="float32")
+        if n == 0:
+            return scores
+
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lens / max(self.avgdl, 1e-9))
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            ids, tf = posting
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tf * (BM25_K1 + 1) / (tf + norm[ids])
+        return scores
+
+    def coverage(self, query: str) -> np.ndarray:
+        """Fraction of distinct query terms present in each document."""
+        terms = set(tokenize(query))
+        covered = np.zeros(len(self.doc_lens), dtype="float32")
+        if not terms:
+            return covered
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                covered[posting[0]] += 1
+        return covered / len(terms)
+
+    def top_k(self, query: str, k: int = 5):
+        """Documents sharing at least one term with the query, best first."""
+        scores = self.scores(query)
+        hits = np.flatnonzero(scores > 0)
+        top = hits[np.argsort(-scores[hits], kind="stable")][:k]
+        return [(int(i), float(scores[i])) for i in top]
+
+    @property
+    def nbytes(self) -> int:
+        arrays = sum(ids.nbytes + tf.nbytes for ids, tf in self.postings.values())
+        return arrays + self.doc_lens.nbytes
+
+    def to_dict(self):
+        return {
+            "postings": {
+                t: [[int(d), int(f)] for d, f in zip(ids, tf)]
+                for t, (ids, tf) in self.postings.items()
+            },
+            "doc_lens": self.doc_lens.astype(int).tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data["postings"], data["doc_lens"])
+
+    def save(self, path: str):
+        # Per-writer tmp name: concurrent saves of the same index never collide
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60):
+    """
+    rankings: lists of ids, best first.
+    RETURNS: [(id, fused_score), ...] best first.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
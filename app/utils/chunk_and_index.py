@@ -2,18 +2,34 @@
 # Per-document FAISS indexing (SAFE + UI-compatible)
 
 import os
-import pickle
+import time
 import hashlib
-import faiss
-from tqdm import tqdm
+import threading
+import numpy as np
 from io import BytesIO
 from app.utils.file_handler import read_file_content
-from app.utils.legal_embeddings import embed_text
+from app.utils.legal_embeddings import embed_texts, embedding_dimension, EMBEDDING_MODEL_ID
+from app.utils.index_cache import index_cache
+from app.utils.vector_store import corpus_store
+from app.utils.chunk_store import (
+    write_chunks, write_doc_metadata, read_doc_metadata, load_chunks, has_chunk_store
+)
+from app.utils.embedding_cache import embedding_cache, chunk_hash
+from app.utils.bm25 import BM25Index
+from app.utils.legal_chunker import chunk_legal_text, CHUNKER_VERSION
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 INDEX_ROOT = os.path.join(BASE_DIR, "index_data")
 os.makedirs(INDEX_ROOT, exist_ok=True)
 
+# Share of a re-upload's chunks that must match the previous upload of the
+# same file name before the two are recorded as versions
+LINEAGE_MIN_OVERLAP = float(os.getenv("LINEAGE_MIN_OVERLAP", "0.3"))
+
+
+# Serializes the one-off bm25.json build for documents indexed before BM25
+_bm25_build_lock = threading.Lock()
+
 
 # ===================== HELPERS =====================
 
@@ -30,13 +46,24 @@ def _doc_folder(doc_hash: str):
 def _index_paths(doc_hash: str):
     folder = _doc_folder(doc_hash)
     return {
+        "folder": folder,
         "index": os.path.join(folder, "faiss.index"),
-        "doc_meta": os.path.join(folder, "doc_metadata.pkl"),
+        "doc_meta": os.path.join(folder, "doc_metadata.json"),
+        "chunk_text": os.path.join(folder, "chunks.bin"),
+        "chunk_offsets": os.path.join(folder, "chunks.offsets.npy"),
+        "bm25": os.path.join(folder, "bm25.json"),
+        # legacy pickle (read-only fallback for unconverted folders)
         "chunk_meta": os.path.join(folder, "chunks_metadata.pkl"),
     }
 
 
-def chunk_text(text: str, chunk_size: int = 400, overlap: int = 50):
+def chunk_text(text: str):
+    """Structure-aware chunks (paragraphs, sections, clauses), see legal_chunker."""
+    return chunk_legal_text(text)
+
+
+def chunk_fixed_windows(text: str, chunk_size: int = 400, overlap: int = 50):
+    """Previous fixed character windows, kept for benchmarks."""
     chunks = []
     start = 0
     n = len(text)
@@ -49,6 +76,106 @@ def chunk_text(text: str, chunk_size: int = 400, overlap: int = 50):
     return chunks
 
 
+def _is_indexed(paths: dict) -> bool:
+    return os.path.exists(paths["index"]) and has_chunk_store(paths["folder"])
+
+
+def _embed_chunks(chunks: list, progress=None):
+    """
+    Embeds only chunks not already in the embedding cache.
+    RETURNS: (vectors, chunk_hashes, num_reused)
+    """
+    hashes = [chunk_hash(c) for c in chunks]
+    cached = embedding_cache.get_many(EMBEDDING_MODEL_ID, hashes)
+
+    missing = {}  # chunk_hash → chunk (dedupes repeated boilerplate)
+    for h, chunk in zip(hashes, chunks):
+        if h not in cached:
+            missing.setdefault(h, chunk)
+
+    if missing:
+        new_vectors = embed_texts(list(missing.values()), progress=progress)
+        fresh = dict(zip(missing.keys(), new_vectors))
+        embedding_cache.put_many(EMBEDDING_MODEL_ID, fresh.items())
+        cached.update(fresh)
+
+    vectors = np.vstack([cached[h] for h in hashes]).astype("float32")
+    return vectors, hashes, len(chunks) - len(missing)
+
+
+def _find_previous_version(file_name: str, doc_hash: str, chunk_hashes: list):
+    """
+    Latest earlier upload with the same file name, but only if at least
+    LINEAGE_MIN_OVERLAP of the new chunks already appear in it: unrelated
+    uploads that are all called "notice.pdf" stay unlinked.
+    """
+    candidate = corpus_store.latest_by_name(file_name) if file_name else None
+    if not candidate or candidate == doc_hash or not chunk_hashes:
+        return None
+
+    meta = read_doc_metadata(os.path.join(INDEX_ROOT, candidate)) or {}
+    previous = set(meta.get("chunk_hashes") or [])
+    shared = sum(1 for h in chunk_hashes if h in previous)
+    return candidate if shared / len(chunk_hashes) >= LINEAGE_MIN_OVERLAP else None
+
+
+def document_lineage(doc_hash: str):
+    """[doc_hash, parent, grandparent, ...] following parent_doc_hash links."""
+    lineage = []
+    while doc_hash and doc_hash not in lineage:
+        lineage.append(doc_hash)
+        meta = read_doc_metadata(os.path.join(INDEX_ROOT, doc_hash)) or {}
+        doc_hash = meta.get("parent_doc_hash")
+    return lineage
+
+
+def _write_index(
+    paths: dict,
+    doc_hash: str,
+    chunks: list,
+    file_name: str,
+    progress=None,
+    parent_doc_hash: str = None
+):
+    """
+    Embeds all chunks in batches and persists index + metadata.
+    One bulk index.add instead of one call per chunk.
+    Unchanged chunks reuse cached embeddings. The document is linked to
+    parent_doc_hash when given, else to a previous upload of the same file
+    name that shares enough chunks.
+    Vectors are also added to the global corpus store.
+    A BM25 index over the same chunks is saved for hybrid retrieval.
+    """
+    import faiss
+
+    vectors, hashes, reused = _embed_chunks(chunks, progress=progress)
+    index = faiss.IndexFlatL2(embedding_dimension())
+    index.add(vectors)
+
+    # ✅ Document-level metadata (FOR UI DROPDOWN)
+    doc_metadata = {
+        "doc_hash": doc_hash,
+        "file_name": file_name,
+        "num_chunks": len(chunks),
+        "created_at": time.time(),
+        "parent_doc_hash": parent_doc_hash or _find_previous_version(file_name, doc_hash, hashes),
+        "embedding_model": EMBEDDING_MODEL_ID,
+        "chunker": CHUNKER_VERSION,
+        "reused_chunks": reused,
+        "chunk_hashes": hashes,
+    }
+
+    faiss.write_index(index, paths["index"])
+    write_chunks(paths["folder"], chunks)
+    BM25Index.build(chunks).save(paths["bm25"])
+    write_doc_metadata(paths["folder"], doc_metadata)
+
+    corpus_store.add_document(doc_hash, vectors, file_name)
+
+    if reused:
+        print(f"♻️ Reused {reused}/{len(chunks)} chunk embeddings")
+
+
 # ===================== BUILD INDEX (FILE) =====================
 
 def build_index_from_file(file_path: str):
@@ -75,81 +202,42 @@ def build_index_from_file(file_path: str):
     doc_hash = _hash_text(text)
     paths = _index_paths(doc_hash)
 
+    # Identical text already indexed → nothing to do
+    if _is_indexed(paths):
+        return doc_hash
+
     chunks = chunk_text(text)
     if not chunks:
         return None
 
-    dim = embed_text("test").shape[0]
-    index = faiss.IndexFlatL2(dim)
-
-    chunk_metadata = []
-
-    for i, chunk in enumerate(tqdm(chunks, desc="Embedding chunks")):
-        emb = embed_text(chunk).reshape(1, -1)
-        index.add(emb)
-        chunk_metadata.append({
-            "id": i,
-            "text": chunk,
-        })
+    _write_index(paths, doc_hash, chunks, os.path.basename(file_path))
 
-    # ✅ Document-level metadata (FOR UI DROPDOWN)
-    doc_metadata = {
-        "doc_hash": doc_hash,
-        "file_name": os.path.basename(file_path),
-        "num_chunks": len(chunks),
-    }
-
-    faiss.write_index(index, paths["index"])
-
-    with open(paths["doc_meta"], "wb") as f:
-        pickle.dump(doc_metadata, f)
-
-    with open(paths["chunk_meta"], "wb") as f:
-        pickle.dump(chunk_metadata, f)
-
-    print(f"✅ FAISS index saved for {doc_metadata['file_name']} → {doc_hash}")
+    print(f"✅ FAISS index saved for {os.path.basename(file_path)} → {doc_hash}")
     return doc_hash
 
 
 # ===================== BUILD INDEX (TEXT) =====================
 
-def build_index_from_text(text: str, source_name: str):
+def build_index_from_text(text: str, source_name: str, progress=None, parent_doc_hash: str = None):
+    """
+    progress(chunks_embedded, chunks_to_embed) is forwarded to embedding.
+    parent_doc_hash: explicit previous version of this document.
+    """
     if len(text.strip()) < 20:
         return None
 
     doc_hash = _hash_text(text)
     paths = _index_paths(doc_hash)
 
+    # Identical text already indexed → nothing to do
+    if _is_indexed(paths):
+        return doc_hash
+
     chunks = chunk_text(text)
     if not chunks:
         return None
 
-    dim = embed_text("test").shape[0]
-    index = faiss.IndexFlatL2(dim)
-
-    chunk_metadata = []
-
-    for i, chunk in enumerate(chunks):
-        emb = embed_text(chunk).reshape(1, -1)
-        index.add(emb)
-        chunk_metadata.append({
-            "id": i,
-            "text": chunk,
-        })
-
-    doc_metadata = {
-        "doc_hash": doc_hash,
-        "file_name": source_name,
-        "num_chunks": len(chunks),
-    }
-
-    faiss.write_index(index, paths["index"])
-
-    with open(paths["doc_meta"], "wb") as f:
-        pickle.dump(doc_metadata, f)
-
-    with open(paths["chunk_meta"], "wb") as f:
-        pickle.dump(chunk_metadata, f)
+    _write_index(paths, doc_hash, chunks, source_name, progress=progress, parent_doc_hash=parent_doc_hash)
 
     print(f"✅ FAISS index saved for {source_name} → {doc_hash}")
     return doc_hash
@@ -161,15 +249,45 @@ def load_faiss_index(doc_hash: str):
     """
     Used by retrieval layer.
     RETURNS: (faiss_index, chunk_metadata)
+    Served from the in-process index cache while files are unchanged.
     """
+    index, chunk_metadata, _ = load_hybrid_index(doc_hash)
+    return index, chunk_metadata
 
+
+def load_hybrid_index(doc_hash: str):
+    """
+    RETURNS: (faiss_index, chunk_metadata, bm25_index)
+    Documents indexed before BM25 existed get their bm25.json built once
+    from the stored chunks.
+    """
     paths = _index_paths(doc_hash)
 
-    if not os.path.exists(paths["index"]) or not os.path.exists(paths["chunk_meta"]):
-        return None, None
+    if has_chunk_store(paths["folder"]):
+        chunk_files = (paths["chunk_text"], paths["chunk_offsets"])
+    else:
+        chunk_files = (paths["chunk_meta"],)
 
-    index = faiss.read_index(paths["index"])
-    with open(paths["chunk_meta"], "rb") as f:
-        chunk_metadata = pickle.load(f)
+    if not os.path.exists(paths["index"]) or not all(os.path.exists(p) for p in chunk_files):
+        return None, None, None
 
-    return index, chunk_metadata
+    if not os.path.exists(paths["bm25"]):
+        with _bm25_build_lock:
+            if not os.path.exists(paths["bm25"]):
+                chunks = load_chunks(paths["folder"])
+                BM25Index.build([c["text"] for c in chunks]).save(paths["bm25"])
+
+    return index_cache.get(
+        doc_hash,
+        (paths["index"], paths["bm25"]) + chunk_files,
+        lambda: _read_index_files(paths)
+    )
+
+
+def _read_index_files(paths: dict):
+    import faiss
+
+    index = faiss.read_index(paths["index"])
+    chunk_metadata = load_chunks(paths["folder"])
+    bm25 = BM25Index.load(paths["bm25"])
+    return index, chunk_metadata, bm25
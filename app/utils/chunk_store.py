@@ -0,0 +1,249 @@
+# app/utils/chunk_store.py
+# Compact on-disk chunk storage (replaces chunks_metadata.pkl / doc_metadata.pkl)
+#
+# Per document folder:
+#   chunks.bin          → all chunk texts, UTF-8, back to back
+#   chunks.offsets.npy  → int64 offsets, len = num_chunks + 1
+#   doc_metadata.json   → small document-level dict
+#
+# Converting existing pickles:
+#     python -m app.utils.chunk_store convert
+
+import os
+import sys
+import json
+import mmap
+import pickle
+import threading
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+INDEX_ROOT = os.path.join(BASE_DIR, "index_data")
+
+CHUNKS_BIN = "chunks.bin"
+CHUNKS_OFFSETS = "chunks.offsets.npy"
+DOC_META_JSON = "doc_metadata.json"
+
+LEGACY_CHUNK_META = "chunks_metadata.pkl"
+LEGACY_DOC_META = "doc_metadata.pkl"
+
+_MMAP_NO_FD = {"trackfd": False} if sys.version_info >= (3, 13) else {}
+
+
+def _tmp_path(path: str) -> str:
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+# ===================== WRITE =====================
+
+def write_chunks(folder: str, chunks: list):
+    encoded = [c.encode("utf-8") for c in chunks]
+    offsets = np.zeros(len(encoded) + 1, dtype="int64")
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+    bin_path = os.path.join(folder, CHUNKS_BIN)
+    offsets_path = os.path.join(folder, CHUNKS_OFFSETS)
+
+    bin_tmp, offsets_tmp = _tmp_path(bin_path), _tmp_path(offsets_path)
+    with open(bin_tmp, "wb") as f:
+        f.write(b"".join(encoded))
+    with open(offsets_tmp, "wb") as f:
+        np.save(f, offsets)
+
+    # Offsets last: a reader never sees offsets pointing past the blob
+    os.replace(bin_tmp, bin_path)
+    os.replace(offsets_tmp, offsets_path)
+
+
+def write_doc_metadata(folder: str, doc_metadata: dict):
+    path = os.path.join(folder, DOC_META_JSON)
+    tmp = _tmp_path(path)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc_metadata, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# ===================== READ =====================
+
+class ChunkStore:
+    """
+    Read-only, memory-mapped view of a document's chunks.
+    store.raw(i) is a zero-copy memoryview; store.text(i) decodes one chunk.
+    store[i] returns {"id", "text"} like the old pickled list.
+    """
+
+    def __init__(self, folder: str):
+        # Offsets are tiny (8 bytes per chunk): read them in, no open handle
+        self.offsets = np.load(os.path.join(folder, CHUNKS_OFFSETS))
+        with open(os.path.join(folder, CHUNKS_BIN), "rb") as f:
+            # The mapping outlives the file object; Python >= 3.13 can also
+            # skip mmap's internal dup of the fd
+            if os.fstat(f.fileno()).st_size:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ, **_MMAP_NO_FD)
+                self._view = memoryview(self._mm)
+            else:
+                self._mm = None
+                self._view = memoryview(b"")
+
+    def close(self):
+        """Unmaps the blob. Outstanding raw() views keep it alive until GC."""
+        if self._mm is None:
+            return
+        try:
+            self._view.release()
+            self._mm.close()
+        except BufferError:
+            return
+        self._mm = None
+        self._view = memoryview(b"")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def raw(self, i: int) -> memoryview:
+        return self._view[int(self.offsets[i]):int(self.offsets[i + 1])]
+
+    def text(self, i: int) -> str:
+        return str(self.raw(i), "utf-8")
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return {"id": i, "text": self.text(i)}
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def nbytes(self) -> int:
+        # Chunk text is paged in by the OS; only the offsets count as heap
+        return self.offsets.nbytes
+
+
+def has_chunk_store(folder: str) -> bool:
+    return (
+        os.path.exists(os.path.join(folder, CHUNKS_BIN))
+        and os.path.exists(os.path.join(folder, CHUNKS_OFFSETS))
+    )
+
+
+def load_chunks(folder: str):
+    """
+    RETURNS: ChunkStore, the legacy pickled list for unconverted folders,
+    or None when the folder has no chunks.
+    """
+    if has_chunk_store(folder):
+        return ChunkStore(folder)
+
+    legacy = os.path.join(folder, LEGACY_CHUNK_META)
+    if os.path.exists(legacy):
+        with open(legacy, "rb") as f:
+            return pickle.load(f)
+    return None
+
+
+def read_doc_metadata(folder: str):
+    path = os.path.join(folder, DOC_META_JSON)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    legacy = os.path.join(folder, LEGACY_DOC_META)
+    if os.path.exists(legacy):
+        with open(legacy, "rb") as f:
+            return pickle.load(f)
+    return None
+
+
+_doc_meta_cache = {}  # folder → (mtime, doc_metadata)
+
+
+def list_documents(index_root: str = INDEX_ROOT):
+    """
+    file_name → doc_hash for every indexed document (UI dropdown).
+    Metadata files are only re-read when they change.
+    """
+    docs_map = {}
+    if not os.path.exists(index_root):
+        return docs_map
+
+    for doc_hash in os.listdir(index_root):
+        folder = os.path.join(index_root, doc_hash)
+        if doc_hash.startswith("_") or not os.path.isdir(folder):
+            continue
+
+        for name in (DOC_META_JSON, LEGACY_DOC_META):
+            path = os.path.join(folder, name)
+            if os.path.exists(path):
+                break
+        else:
+            continue
+
+        try:
+            mtime = os.path.getmtime(path)
+            cached = _doc_meta_cache.get(folder)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, read_doc_metadata(folder))
+                _doc_meta_cache[folder] = cached
+
+            file_name = (cached[1] or {}).get("file_name")
+            if file_name:
+                docs_map[file_name] = doc_hash
+        except Exception:
+            continue
+
+    return docs_map
+
+
+# ===================== CONVERTER =====================
+
+def convert_legacy_folder(folder: str, remove_pickles: bool = False) -> bool:
+    """Rewrites one folder's pickles in the new format. Returns True if converted."""
+    chunk_pkl = os.path.join(folder, LEGACY_CHUNK_META)
+    doc_pkl = os.path.join(folder, LEGACY_DOC_META)
+    converted = False
+
+    if os.path.exists(chunk_pkl) and not has_chunk_store(folder):
+        with open(chunk_pkl, "rb") as f:
+            chunk_metadata = pickle.load(f)
+        write_chunks(folder, [c["text"] for c in sorted(chunk_metadata, key=lambda c: c["id"])])
+        converted = True
+
+    if os.path.exists(doc_pkl) and not os.path.exists(os.path.join(folder, DOC_META_JSON)):
+        with open(doc_pkl, "rb") as f:
+            write_doc_metadata(folder, pickle.load(f))
+        converted = True
+
+    if remove_pickles:
+        if has_chunk_store(folder) and os.path.exists(chunk_pkl):
+            os.remove(chunk_pkl)
+        if os.path.exists(os.path.join(folder, DOC_META_JSON)) and os.path.exists(doc_pkl):
+            os.remove(doc_pkl)
+
+    return converted
+
+
+def convert_all(index_root: str = INDEX_ROOT, remove_pickles: bool = False):
+    count = 0
+    for doc_hash in sorted(os.listdir(index_root)):
+        folder = os.path.join(index_root, doc_hash)
+        if doc_hash.startswith("_") or not os.path.isdir(folder):
+            continue
+        try:
+            if convert_legacy_folder(folder, remove_pickles=remove_pickles):
+                count += 1
+                print(f"✅ Converted {doc_hash}")
+        except Exception as e:
+            print(f"⚠️ {doc_hash}: {e}")
+    print(f"Converted {count} folder(s)")
+    return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "convert":
+        convert_all(remove_pickles="--remove-pickles" in sys.argv)
+    else:
+        print("usage: python -m app.utils.chunk_store convert [--remove-pickles]")
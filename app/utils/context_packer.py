@@ -0,0 +1,148 @@
+# app/utils/context_packer.py
+# Token-budgeted RAG context for draft prompts
+#
+# Chunks arrive best-first from retrieval. The packer
+#   1. strips text a chunk shares with an already kept chunk (chunk overlap)
+#   2. drops near-duplicates (word-shingle Jaccard)
+#   3. fills the token budget in relevance order, trimming the last chunk
+#
+# Tokens are counted with the model's tiktoken encoding (see requirements.txt);
+# ~4 chars per token only if tiktoken or its encoding files are unavailable.
+
+import os
+import re
+
+try:
+    import tiktoken
+except ImportError:  # optional dependency
+    tiktoken = None
+
+# Below the old prompt context (top-5 x 400-char chunks ≈ 500 tokens)
+RAG_CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "450"))
+NEAR_DUPLICATE_JACCARD = 0.8
+MIN_OVERLAP_CHARS = 20
+MAX_OVERLAP_CHARS = 512
+MIN_TAIL_TOKENS = 64  # a trimmed last chunk shorter than this is dropped
+SEPARATOR = "\n\n"
+
+# Totals across packed prompts (exported at /draft/metrics)
+packing_metrics = {
+    "packed": 0,
+    "chunks_in": 0,
+    "chunks_kept": 0,
+    "duplicates_dropped": 0,
+    "overlap_chars_removed": 0,
+    "context_tokens": 0,
+}
+
+_encodings = {}
+
+
+def _encoding(model: str = None):
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model or "")
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("o200k_base")
+        except Exception as e:  # BPE files are fetched on first use (offline hosts)
+            print("⚠️ tiktoken encoding unavailable, estimating tokens:", e)
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    enc = _encoding(model)
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def _truncate_tokens(text: str, max_tokens: int, model: str = None) -> str:
+    enc = _encoding(model)
+    if enc is None:
+        return text[:max_tokens * 4]
+    return enc.decode(enc.encode(text, disallowed_special=())[:max_tokens])
+
+
+def _shingles(text: str, n: int = 3):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < n:
+        return {tuple(words)}
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def _strip_overlap(chunk: str, kept):
+    """Removes a prefix of `chunk` that is the tail of a kept chunk."""
+    best = 0
+    for prev in kept:
+        limit = min(len(prev), len(chunk), MAX_OVERLAP_CHARS)
+        for size in range(limit, MIN_OVERLAP_CHARS - 1, -1):
+            if prev.endswith(chunk[:size]):
+                best = max(best, size)
+                break
+    return chunk[best:].lstrip(), best
+
+
+def pack_context(chunks, budget_tokens: int = None, model: str = None):
+    """
+    chunks: chunk texts, most relevant first.
+    RETURNS: (context_text, stats) with context_text within budget_tokens.
+    """
+    budget = budget_tokens or RAG_CONTEXT_TOKENS
+    sep_tokens = count_tokens(SEPARATOR, model)
+
+    kept, kept_shingles = [], []
+    used = 0
+    duplicates = 0
+    overlap_removed = 0
+
+    for chunk in chunks:
+        chunk = (chunk or "").strip()
+        if not chunk:
+            continue
+
+        if any(chunk in prev for prev in kept):
+            duplicates += 1
+            continue
+
+        chunk, removed = _strip_overlap(chunk, kept)
+        overlap_removed += removed
+        if not chunk:
+            continue
+
+        shingles = _shingles(chunk)
+        if any(
+            len(shingles & prev) / max(len(shingles | prev), 1) >= NEAR_DUPLICATE_JACCARD
+            for prev in kept_shingles
+        ):
+            duplicates += 1
+            continue
+
+        cost = count_tokens(chunk, model) + (sep_tokens if kept else 0)
+        if used + cost > budget:
+            remaining = budget - used - (sep_tokens if kept else 0)
+            if remaining >= MIN_TAIL_TOKENS:
+                chunk = _truncate_tokens(chunk, remaining, model)
+                kept.append(chunk)
+                used += count_tokens(chunk, model) + (sep_tokens if len(kept) > 1 else 0)
+            break
+
+        kept.append(chunk)
+        kept_shingles.append(shingles)
+        used += cost
+
+    stats = {
+        "chunks_in": len(chunks),
+        "chunks_kept": len(kept),
+        "duplicates_dropped": duplicates,
+        "overlap_chars_removed": overlap_removed,
+        "context_tokens": used,
+    }
+    packing_metrics["packed"] += 1
+    for key, value in stats.items():
+        packing_metrics[key] += value
+
+    return SEPARATOR.join(kept), stats
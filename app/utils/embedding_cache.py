@@ -0,0 +1,91 @@
+# app/utils/embedding_cache.py
+# Persistent chunk embedding cache keyed by (model, chunk hash)
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+CACHE_PATH = os.path.join(BASE_DIR, "index_data", "_embedding_cache.sqlite")
+
+# Least recently used vectors beyond this are deleted (~3 KB each at 768 dims)
+EMBEDDING_CACHE_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "100000"))
+
+# SQLite caps the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+
+def chunk_hash(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:16]
+
+
+class EmbeddingCache:
+    """
+    Embeddings survive re-uploads: a chunk whose text is unchanged is never
+    embedded twice by the same model.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_rows: int = EMBEDDING_CACHE_MAX_ROWS):
+        self.max_rows = max_rows
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " chunk_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (model, chunk_hash))"
+        )
+        # Caches created before last_used existed: old rows go first
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+        if "last_used" not in columns:
+            self._conn.execute("ALTER TABLE embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get_many(self, model: str, hashes) -> dict:
+        """chunk_hash → float32 vector for every hash already cached."""
+        found = {}
+        unique = list(set(hashes))
+        with self._lock:
+            for start in range(0, len(unique), _LOOKUP_BATCH):
+                batch = unique[start:start + _LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    "SELECT chunk_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND chunk_hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch]
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype="float32")
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND chunk_hash = ?",
+                    [(now, model, h) for h in found]
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, model: str, items):
+        """items: iterable of (chunk_hash, vector). Trims to max_rows (LRU)."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, chunk_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(model, h, np.asarray(v, dtype="float32").tobytes(), now) for h, v in items]
+            )
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN ("
+                " SELECT rowid FROM embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,)
+            )
+            self._conn.commit()
+
+
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,45 @@
+# app/utils/embedding_pool.py
+# Bounded execution layer for CPU-heavy embedding jobs
+
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from app.utils.legal_embeddings import EMBED_WORKERS
+from app.utils.query_batcher import QUERY_BATCHING
+
+# torch releases the GIL inside forward passes, so threads scale across
+# cores; the pool size caps how many jobs run at once (see EMBED_THREADS).
+_executor = ThreadPoolExecutor(
+    max_workers=EMBED_WORKERS,
+    thread_name_prefix="embed"
+)
+
+# Retrieval calls mostly wait on the query micro-batcher, so they get their
+# own wider pool: many concurrent waiters → bigger batches. Without the
+# batcher every query runs its own forward pass → same cap as embedding.
+QUERY_THREADS = int(os.getenv("QUERY_THREADS", "32")) if QUERY_BATCHING else EMBED_WORKERS
+_query_executor = ThreadPoolExecutor(
+    max_workers=QUERY_THREADS,
+    thread_name_prefix="query"
+)
+
+
+async def run_embedding_job(fn, *args, **kwargs):
+    """
+    Runs a blocking embedding/indexing call on the embedding pool
+    without blocking the event loop.
+    Extra requests queue instead of oversubscribing the CPU.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
+
+
+async def run_query_job(fn, *args, **kwargs):
+    """
+    Like run_embedding_job for retrieval-side calls (query embedding +
+    index search). Their forward passes run batched on the query batcher.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_query_executor, partial(fn, *args, **kwargs))
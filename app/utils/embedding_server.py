@@ -0,0 +1,192 @@
+# app/utils/embedding_server.py
+# One process owns Legal-BERT; API workers embed through a Unix socket
+#
+#   python -m app.utils.embedding_server [/path/to/socket]
+#   EMBEDDING_SERVER_SOCKET=/path/to/socket uvicorn main:app --workers 8
+#
+# With EMBEDDING_SERVER_SOCKET set, legal_embeddings never loads the model in
+# the worker: embed_text / embed_texts / embedding_dimension go to the server.
+#
+# Protocol (persistent connection, request → response):
+#   frame   = 4-byte big-endian length + payload
+#   request = JSON frame {"op": "embed", "texts": [...], "batch_size": n}
+#             or {"op": "info"}
+#   reply   = JSON frame {"ok": true, "shape": [n, dim]} + one frame of
+#             float32 row-major vectors (embed), {"ok": true, "dim", "model_id"}
+#             (info), or {"ok": false, "error": "..."}
+
+import os
+import sys
+import json
+import socket
+import struct
+import threading
+import socketserver
+import numpy as np
+
+DEFAULT_SOCKET = os.getenv("EMBEDDING_SERVER_SOCKET") or "/tmp/drafting-embeddings.sock"
+
+# Texts per request when the client embeds a long list (progress granularity)
+REMOTE_REQUEST_TEXTS = 256
+
+_HEADER = struct.Struct(">I")
+
+
+# ===================== FRAMING =====================
+
+def _recv_exact(sock, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        part = sock.recv(n - len(buf))
+        if not part:
+            raise ConnectionError("embedding server connection closed")
+        buf += part
+    return bytes(buf)
+
+
+def _send_frame(sock, payload: bytes):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_frame(sock) -> bytes:
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return _recv_exact(sock, size)
+
+
+def _send_json(sock, obj):
+    _send_frame(sock, json.dumps(obj).encode("utf-8"))
+
+
+# ===================== SERVER =====================
+
+class _EmbeddingHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        from app.utils import legal_embeddings as le
+
+        while True:
+            try:
+                request = json.loads(_recv_frame(self.request))
+            except (ConnectionError, OSError):
+                return
+
+            try:
+                if request.get("op") == "embed":
+                    with self.server.slots:
+                        vectors = le.embed_texts_local(
+                            request["texts"], batch_size=request.get("batch_size")
+                        )
+                    vectors = np.ascontiguousarray(vectors, dtype="float32")
+                    _send_json(self.request, {"ok": True, "shape": list(vectors.shape)})
+                    _send_frame(self.request, vectors.tobytes())
+                elif request.get("op") == "info":
+                    _send_json(self.request, {
+                        "ok": True,
+                        "dim": le.embedding_dimension_local(),
+                        "model_id": le.EMBEDDING_MODEL_ID,
+                    })
+                else:
+                    _send_json(self.request, {
+                        "ok": False,
+                        "error": f"unknown op {request.get('op')!r}",
+                    })
+            except (ConnectionError, OSError):
+                return
+            except Exception as e:
+                _send_json(self.request, {"ok": False, "error": str(e)})
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, workers: int):
+        if os.path.exists(path):
+            os.remove(path)  # stale socket from a previous run
+        super().__init__(path, _EmbeddingHandler)
+        os.chmod(path, 0o600)
+        # Same CPU policy as in-process embedding: EMBED_WORKERS jobs at a time
+        self.slots = threading.BoundedSemaphore(workers)
+
+
+def serve(path: str = DEFAULT_SOCKET):
+    from app.utils import legal_embeddings as le
+
+    # This process owns the model: never route back to a server
+    le.EMBEDDING_SERVER_SOCKET = None
+    le.warm_up()
+    server = EmbeddingServer(path, le.EMBED_WORKERS)
+    print(f"✅ Embedding server listening on {path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# ===================== CLIENT =====================
+
+class EmbeddingClient:
+    """
+    Thread-safe client: every thread keeps its own persistent connection,
+    reconnecting once if the server restarted.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET, timeout: float = 300):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._info = None
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        self._local.sock = sock
+        return sock
+
+    def _call(self, request: dict, with_vectors: bool = False):
+        for attempt in (0, 1):
+            sock = getattr(self._local, "sock", None)
+            try:
+                sock = sock or self._connect()
+                _send_json(sock, request)
+                reply = json.loads(_recv_frame(sock))
+                body = _recv_frame(sock) if with_vectors and reply.get("ok") else None
+                break
+            except (ConnectionError, OSError):
+                if sock is not None:
+                    sock.close()
+                self._local.sock = None
+                if attempt:
+                    raise ConnectionError(f"embedding server unavailable at {self.path}")
+
+        if not reply.get("ok"):
+            raise RuntimeError(f"embedding server error: {reply.get('error')}")
+        return reply, body
+
+    def info(self):
+        if self._info is None:
+            self._info, _ = self._call({"op": "info"})
+        return self._info
+
+    def dimension(self) -> int:
+        return self.info()["dim"]
+
+    def embed_texts(self, texts, batch_size: int = None, progress=None) -> np.ndarray:
+        texts = list(texts)
+        out = np.zeros((len(texts), self.dimension()), dtype="float32")
+        for start in range(0, len(texts), REMOTE_REQUEST_TEXTS):
+            part = texts[start:start + REMOTE_REQUEST_TEXTS]
+            reply, body = self._call(
+                {"op": "embed", "texts": part, "batch_size": batch_size},
+                with_vectors=True
+            )
+            out[start:start + len(part)] = np.frombuffer(body, dtype="float32").reshape(reply["shape"])
+            if progress:
+                progress(start + len(part), len(texts))
+        return out
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SOCKET)
@@ -0,0 +1,98 @@
+# app/utils/extraction_cache.py
+# Content-addressed cache of extracted document text
+#
+# key = SHA-256(extractor version + file type + OCR mode + raw bytes)
+# value = {"text", "pages"} as JSON under index_data/_extraction_cache/
+
+import os
+import json
+import hashlib
+import threading
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, "index_data", "_extraction_cache")
+
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MB", "256")) * 1024 * 1024
+
+
+class ExtractionCache:
+    """
+    Parsing/OCR results survive across requests, processes and the UI.
+    Least-recently-used files are evicted once the directory exceeds
+    `max_bytes` (hits refresh the file mtime).
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = EXTRACTION_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(raw_bytes: bytes, filename: str, version: str, force_ocr: bool) -> str:
+        ext = os.path.splitext((filename or "").lower())[1]
+        h = hashlib.sha256(f"{version}|{ext}|{int(force_ocr)}|".encode("utf-8"))
+        h.update(raw_bytes)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.name.endswith(".json"):
+                    continue
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "max_bytes": self.max_bytes,
+            }
+
+
+extraction_cache = ExtractionCache()
@@ -1,34 +1,205 @@
 # file_handler.py
-import docx
+# docx / pdfplumber / pdf2image / pytesseract are imported where they are
+# used, so endpoints that never parse files don't load them.
+import os
+import time
+import tempfile
+import subprocess
 from io import BytesIO
-import pytesseract
-from pdf2image import convert_from_bytes
-import pdfplumber
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.extraction_cache import extraction_cache
 
 MIN_TEXT_LEN = 20  # Lowered threshold
+# Pages whose text layer is shorter than this are OCR'd (scanned annexures)
+MIN_PAGE_TEXT_LEN = int(os.getenv("MIN_PAGE_TEXT_LEN", "40"))
+
+# Bump when extraction logic changes → old cache entries stop matching
+EXTRACTOR_VERSION = "2"
+
+# OCR tuning
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, (os.cpu_count() or 1) // 2))))
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_RASTER_BATCH = 4  # pages rasterized per pdftoppm call
+
+# One tesseract thread per page job; parallelism comes from OCR_WORKERS.
+# Only the tesseract subprocesses get this: setting it on os.environ would
+# also cap torch's OpenMP threads (EMBED_THREADS) in this process.
+_TESSERACT_ENV = {**os.environ, "OMP_THREAD_LIMIT": "1"}
 
-def ocr_pdf(file_bytes: bytes) -> str:
+# Each worker thread waits on its own tesseract subprocess, so a thread
+# pool gives real multi-core OCR without pickling page images.
+_ocr_executor = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr")
+
+
+def _ocr_page(image_path: str):
+    """RETURNS: (text, seconds)"""
+    import pytesseract
+
+    start = time.perf_counter()
     try:
-        images = convert_from_bytes(file_bytes)
+        proc = subprocess.run(
+            [pytesseract.pytesseract.tesseract_cmd, image_path, "stdout"],
+            env=_TESSERACT_ENV,
+            capture_output=True,
+            check=True
+        )
+        text = proc.stdout.decode("utf-8", errors="ignore")
     except Exception:
-        return ""
+        text = ""
+    return text, time.perf_counter() - start
+
+
+def _page_runs(page_numbers, max_len: int):
+    """[1, 2, 3, 7, 8] → [(1, 3), (7, 8)], each run at most max_len pages."""
+    runs = []
+    for n in page_numbers:
+        if runs and n == runs[-1][1] + 1 and n - runs[-1][0] < max_len:
+            runs[-1][1] = n
+        else:
+            runs.append([n, n])
+    return [tuple(r) for r in runs]
+
+
+def ocr_pages(file_bytes: bytes, page_numbers=None, progress=None, min_chars: int = None):
+    """
+    Streaming OCR of selected PDF pages (1-based; None → every page).
+
+    - Pages are rasterized lazily, a few at a time, to PNG files in a temp dir
+    - Tesseract runs on OCR_WORKERS pages concurrently
+    - At most ~2 x OCR_WORKERS rasterized pages wait on disk at any time
+    - min_chars: stop rasterizing once this much text is recovered
+    - progress(page_done, total_pages) is called after every page
+
+    RETURNS: {page_number: (text, seconds)}
+    """
+    from pdf2image import convert_from_path, pdfinfo_from_path
+
+    results = {}
+
+    with tempfile.TemporaryDirectory(prefix="ocr_") as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "input.pdf")
+        with open(pdf_path, "wb") as f:
+            f.write(file_bytes)
+
+        if page_numbers is None:
+            try:
+                page_numbers = range(1, int(pdfinfo_from_path(pdf_path)["Pages"]) + 1)
+            except Exception:
+                return results
+        page_numbers = sorted(page_numbers)
+        total = len(page_numbers)
+
+        pending = deque()  # (page_number, image_path, raster_seconds, future) in page order
+        state = {"done": 0, "chars": 0}
+
+        def collect(limit: int):
+            while len(pending) > limit:
+                page_no, image_path, raster_seconds, future = pending.popleft()
+                text, seconds = future.result()
+                results[page_no] = (text, raster_seconds + seconds)
+                os.remove(image_path)
+                state["done"] += 1
+                state["chars"] += len(text.strip())
+                if progress:
+                    progress(state["done"], total)
+
+        for first, last in _page_runs(page_numbers, OCR_RASTER_BATCH):
+            start = time.perf_counter()
+            try:
+                image_paths = convert_from_path(
+                    pdf_path,
+                    dpi=OCR_DPI,
+                    first_page=first,
+                    last_page=last,
+                    output_folder=tmp_dir,
+                    fmt="png",
+                    paths_only=True
+                )
+            except Exception:
+                continue
+            raster_seconds = (time.perf_counter() - start) / max(len(image_paths), 1)
+
+            for offset, image_path in enumerate(sorted(image_paths)):
+                future = _ocr_executor.submit(_ocr_page, image_path)
+                pending.append((first + offset, image_path, raster_seconds, future))
+
+            collect(OCR_WORKERS * 2)
+
+            if min_chars and state["chars"] >= min_chars:
+                break
+
+        collect(0)
+
+    return results
 
-    text = ""
-    for img in images:
-        try:
-            text += pytesseract.image_to_string(img) + "\n"
-        except Exception:
-            continue
 
-    return text.strip()
+def ocr_pdf(file_bytes: bytes, progress=None, min_chars: int = None) -> str:
+    """OCR every page; text in page order."""
+    results = ocr_pages(file_bytes, progress=progress, min_chars=min_chars)
+    return "\n".join(results[n][0] for n in sorted(results) if results[n][0]).strip()
 
 
-def read_file_content(uploaded_file, force_ocr: bool = False) -> str:
+def extract_pdf_pages(raw_bytes: bytes, force_ocr: bool = False, progress=None):
+    """
+    Page-level hybrid extraction.
+
+    - pdfplumber text layer for every page
+    - OCR only for pages whose text layer has < MIN_PAGE_TEXT_LEN chars
+      (every page when force_ocr=True)
+
+    RETURNS: list of {"page", "source": "text" | "ocr", "chars", "seconds", "text"}
+    """
+    import pdfplumber
+
+    pages = []
+    try:
+        with pdfplumber.open(BytesIO(raw_bytes)) as pdf:
+            for i, page in enumerate(pdf.pages):
+                start = time.perf_counter()
+                extracted = (page.extract_text() or "").strip()
+                pages.append({
+                    "page": i + 1,
+                    "source": "text",
+                    "chars": len(extracted),
+                    "seconds": round(time.perf_counter() - start, 4),
+                    "text": extracted,
+                })
+    except Exception:
+        pages = []
+
+    if pages:
+        needs_ocr = [p["page"] for p in pages if force_ocr or p["chars"] < MIN_PAGE_TEXT_LEN]
+    else:
+        needs_ocr = None  # text layer unreadable → OCR everything
+
+    if needs_ocr is None or needs_ocr:
+        ocr = ocr_pages(raw_bytes, page_numbers=needs_ocr, progress=progress)
+        by_number = {p["page"]: p for p in pages}
+
+        for page_no, (text, seconds) in ocr.items():
+            text = text.strip()
+            page = by_number.get(page_no)
+            if page is None:
+                page = {"page": page_no, "seconds": 0.0}
+                pages.append(page)
+            # Keep the text layer if OCR recovered less (e.g. a blank page)
+            if len(text) >= page.get("chars", 0):
+                page.update({"source": "ocr", "chars": len(text), "text": text})
+            page["seconds"] = round(page["seconds"] + seconds, 4)
+
+        pages.sort(key=lambda p: p["page"])
+
+    return pages
+
+
+def read_file_content(uploaded_file, force_ocr: bool = False, progress=None) -> str:
     """
     Extract text from uploaded file.
 
     - Primary extraction first
-    - OCR fallback only if primary fails OR force_ocr=True
+    - OCR only for the PDF pages that need it (all pages if force_ocr=True)
     """
 
     if uploaded_file is None:
@@ -37,7 +208,7 @@ def read_file_content(uploaded_file, force_ocr: bool = False) -> str:
     filename = (
         getattr(uploaded_file, "filename", None)
         or getattr(uploaded_file, "name", "")
-    ).lower()
+    )
 
     try:
         if hasattr(uploaded_file, "file"):
@@ -48,11 +219,48 @@ def read_file_content(uploaded_file, force_ocr: bool = False) -> str:
     except Exception:
         return ""
 
+    return read_bytes_content(raw_bytes, filename, force_ocr=force_ocr, progress=progress)
+
+
+def read_bytes_content(raw_bytes: bytes, filename: str, force_ocr: bool = False, progress=None) -> str:
+    """
+    Same as read_file_content, for bytes already read from the upload.
+    progress(page_done, total_pages) is forwarded to OCR.
+    """
+    text, _ = extract_document(raw_bytes, filename, force_ocr=force_ocr, progress=progress)
+    return text
+
+
+def extract_document(raw_bytes: bytes, filename: str, force_ocr: bool = False, progress=None):
+    """
+    RETURNS: (text, pages)
+    pages holds per-page provenance and timings for PDFs (see extract_pdf_pages)
+    without the page text; it is empty for DOCX/TXT.
+    Results are served from the extraction cache when the same bytes were
+    already extracted.
+    """
+    version = f"{EXTRACTOR_VERSION}:{MIN_PAGE_TEXT_LEN}:{OCR_DPI}"
+    key = extraction_cache.key(raw_bytes, filename, version, force_ocr)
+
+    cached = extraction_cache.get(key)
+    if cached is not None:
+        return cached["text"], cached["pages"]
+
+    text, pages = _extract_uncached(raw_bytes, filename, force_ocr, progress)
+    if text:
+        extraction_cache.put(key, {"text": text, "pages": pages})
+    return text, pages
+
+
+def _extract_uncached(raw_bytes: bytes, filename: str, force_ocr: bool, progress):
+    filename = (filename or "").lower()
     text = ""
+    pages = []
 
     # DOCX
     if filename.endswith(".docx"):
         try:
+            import docx
             doc = docx.Document(BytesIO(raw_bytes))
             text = "\n".join(p.text for p in doc.paragraphs if p.text.strip())
         except Exception:
@@ -69,21 +277,12 @@ def read_file_content(uploaded_file, force_ocr: bool = False) -> str:
     elif filename.endswith(".pdf"):
         # HARD GUARD
         if not raw_bytes.startswith(b"%PDF"):
-            return ""
-
-        # 1️⃣ pdfplumber primary
-        try:
-            with pdfplumber.open(BytesIO(raw_bytes)) as pdf:
-                for page in pdf.pages:
-                    extracted = page.extract_text()
-                    if extracted:
-                        text += extracted + "\n"
-        except Exception:
-            text = ""
+            return "", []
 
-        # 2️⃣ Fallback OCR if not enough text or force_ocr
-        if force_ocr or len(text.strip()) < MIN_TEXT_LEN:
-            text = ocr_pdf(raw_bytes)
+        pages = extract_pdf_pages(raw_bytes, force_ocr=force_ocr, progress=progress)
+        text = "\n".join(p["text"] for p in pages if p["text"])
+        pages = [{k: v for k, v in p.items() if k != "text"} for p in pages]
 
     # Return if enough text
-    return text.strip() if len(text.strip()) >= MIN_TEXT_LEN else ""
+    text = text.strip()
+    return (text if len(text) >= MIN_TEXT_LEN else ""), pages
@@ -0,0 +1,100 @@
+# app/utils/index_cache.py
+# In-process LRU cache of loaded per-document FAISS indexes
+
+import os
+import threading
+from collections import OrderedDict
+
+# Upper bound on vectors + chunk text + BM25 postings kept in memory
+INDEX_CACHE_MAX_BYTES = int(os.getenv("INDEX_CACHE_MB", "512")) * 1024 * 1024
+
+
+def _estimate_bytes(index, chunk_metadata, bm25=None) -> int:
+    vectors = index.ntotal * index.d * 4
+    if hasattr(chunk_metadata, "nbytes"):
+        texts = chunk_metadata.nbytes   # mmap-backed ChunkStore
+    else:
+        texts = sum(len(c["text"]) for c in chunk_metadata)
+    lexical = bm25.nbytes if bm25 is not None else 0
+    return vectors + texts + lexical
+
+
+class IndexCache:
+    """
+    doc_hash → (index, chunk_metadata, bm25), evicted least-recently-used once
+    the estimated size exceeds `max_bytes`.
+    An entry is reloaded when any of its files changes on disk (mtime).
+    """
+
+    def __init__(self, max_bytes: int = INDEX_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _signature(paths):
+        try:
+            return tuple(os.path.getmtime(p) for p in paths)
+        except OSError:
+            return None
+
+    def get(self, doc_hash: str, paths, loader):
+        """
+        Returns loader() output for doc_hash, from memory when the files
+        listed in `paths` are unchanged since they were cached.
+        """
+        signature = self._signature(paths)
+
+        with self._lock:
+            entry = self._entries.get(doc_hash)
+            if entry is not None and signature is not None and entry[0] == signature:
+                self._entries.move_to_end(doc_hash)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = loader()
+        if signature is None or value[0] is None:
+            return value
+
+        size = _estimate_bytes(*value)
+        with self._lock:
+            self._drop(doc_hash)
+            if size <= self.max_bytes:
+                self._entries[doc_hash] = (signature, value, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    oldest = next(iter(self._entries))
+                    self._drop(oldest)
+                    self.evictions += 1
+        return value
+
+    def _drop(self, doc_hash: str):
+        entry = self._entries.pop(doc_hash, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def invalidate(self, doc_hash: str):
+        with self._lock:
+            self._drop(doc_hash)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+# Shared by every caller of load_faiss_index (draft generation + analysis)
+index_cache = IndexCache()
@@ -0,0 +1,82 @@
+# app/utils/json_stream.py
+# Incremental parser for a JSON object arriving in streamed text deltas
+
+import json
+
+
+class IncrementalJSONObjectParser:
+    """
+    Feed text deltas; the first top-level {...} object is parsed the
+    moment its closing brace arrives.
+
+    - Leading chatter / ```json fences before the object are skipped
+    - Anything after the object is ignored
+    - Braces inside strings (and escaped quotes) are handled
+    """
+
+    def __init__(self):
+        self._buf = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self.result = None
+        self.error = None
+        self._deltas = []  # every delta fed, joined on demand (see raw)
+
+    @property
+    def raw(self) -> str:
+        """Everything fed so far, for repair prompts."""
+        return "".join(self._deltas)
+
+    @property
+    def complete(self) -> bool:
+        return self.result is not None or self.error is not None
+
+    def feed(self, delta: str):
+        """Returns the parsed object once complete, else None."""
+        self._deltas.append(delta)
+        if self.complete:
+            return self.result
+
+        for ch in delta:
+            if not self._started:
+                if ch != "{":
+                    continue
+                self._started = True
+
+            self._buf.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        self.result = json.loads("".join(self._buf))
+                    except json.JSONDecodeError as e:
+                        self.error = e
+                    return self.result
+
+        return None
+
+    def close(self):
+        """End of stream: raises ValueError if no complete object was seen."""
+        if self.result is not None:
+            return self.result
+        if self.error is not None:
+            raise ValueError(f"Invalid JSON object: {self.error}")
+        if self._started:
+            raise ValueError("Truncated JSON object")
+        raise ValueError("No JSON object in output")
@@ -0,0 +1,150 @@
+# app/utils/legal_chunker.py
+# Structure-aware chunking for notices, orders and pleadings
+#
+# One pass over the lines of the document:
+#   - a line opening a numbered paragraph, "Section", "Clause", "WHEREAS",
+#     "NOW THEREFORE" ... starts a new block
+#   - a "Versus" line glues the parties above and below into one block
+#   - blocks are packed into chunks of ~CHUNK_TARGET_TOKENS; a major heading
+#     (Section / Clause / Article / Chapter / WHEREAS) closes the open chunk
+#   - a block longer than CHUNK_MAX_TOKENS is split at sentence ends
+#
+# Token counts are estimated from words (Legal-BERT wordpieces ≈ 1.3 / word).
+
+import os
+import re
+
+CHUNKER_VERSION = "structure-1"
+
+CHUNK_TARGET_TOKENS = int(os.getenv("CHUNK_TARGET_TOKENS", "256"))
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "384"))   # < 512 model limit
+CHUNK_MIN_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", "64"))
+TOKENS_PER_WORD = 1.3
+
+_PARAGRAPH_RE = re.compile(
+    r"^\s*(?:"
+    r"\d{1,3}(?:\.\d{1,3})*[.)]"          # 1.  2)  3.1.
+    r"|\(\d{1,3}\)"                       # (4)
+    r"|\([a-z]{1,2}\)"                    # (a) (iv is below)
+    r"|\((?:[ivx]{1,5})\)"                # (iv)
+    r"|[ivx]{1,5}[.)]"                    # iv.  ii)
+    r")\s+\S",
+    re.IGNORECASE
+)
+_MAJOR_RE = re.compile(
+    r"^\s*(?:section|sec\.|clause|article|chapter|schedule|rule|part)\s+(?:\d|[IVXLC]+\b)"
+    r"|^\s*(?:whereas|now,?\s+therefore|prayer|in\s+the\s+matter\s+of)\b",
+    re.IGNORECASE
+)
+# PDF text wraps mid-sentence: "... barred under\nSection 16(4) of ..." is not a heading
+_CONTINUES_RE = re.compile(r"[a-z,(\-]$")
+_VERSUS_RE = re.compile(r"^\s*(?:versus|vs\.?|v\.)\s*$", re.IGNORECASE)
+_SENTENCE_END_RE = re.compile(r"(?<=[.;:?!])\s+")
+
+
+def _tokens(words: int) -> int:
+    return int(words * TOKENS_PER_WORD + 0.5)
+
+
+def _split_oversized(block: str, max_tokens: int):
+    """Sentence-level split of one block; words as a last resort."""
+    pieces, current, current_words = [], [], 0
+    max_words = max(1, int(max_tokens / TOKENS_PER_WORD))
+
+    for sentence in _SENTENCE_END_RE.split(block):
+        words = sentence.split()
+        while len(words) > max_words:  # a single run-on "sentence"
+            if current:
+                pieces.append(" ".join(current))
+                current, current_words = [], 0
+            pieces.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+        if current_words + len(words) > max_words and current:
+            pieces.append(" ".join(current))
+            current, current_words = [], 0
+        if words:
+            current.append(" ".join(words))
+            current_words += len(words)
+
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_legal_text(
+    text: str,
+    target_tokens: int = None,
+    max_tokens: int = None,
+    min_tokens: int = None
+):
+    """
+    RETURNS: list of chunk strings following the document's own structure.
+    """
+    target = target_tokens or CHUNK_TARGET_TOKENS
+    limit = max(max_tokens or CHUNK_MAX_TOKENS, target)
+    minimum = CHUNK_MIN_TOKENS if min_tokens is None else min_tokens
+
+    chunks = []
+    chunk_parts, chunk_words = [], 0
+    block_lines, block_words, block_major = [], 0, False
+    glue_next = False
+    previous = ""
+
+    def flush_chunk():
+        nonlocal chunk_parts, chunk_words
+        if chunk_parts:
+            chunks.append("\n".join(chunk_parts))
+        chunk_parts, chunk_words = [], 0
+
+    def flush_block():
+        nonlocal block_lines, block_words, block_major, chunk_words
+        if not block_lines:
+            return
+        block = "\n".join(block_lines)
+        tokens = _tokens(block_words)
+
+        # Major headings open a new chunk once the current one has substance
+        if block_major and _tokens(chunk_words) >= minimum:
+            flush_chunk()
+
+        if tokens > limit:
+            flush_chunk()
+            for piece in _split_oversized(block, target):
+                chunks.append(piece)
+        else:
+            if chunk_parts and _tokens(chunk_words) + tokens > target:
+                flush_chunk()
+            chunk_parts.append(block)
+            chunk_words += block_words
+
+        block_lines, block_words, block_major = [], 0, False
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            # Blank line ends a paragraph unless we are inside a Versus block
+            if not glue_next:
+                flush_block()
+                previous = ""
+            continue
+
+        if _VERSUS_RE.match(stripped):
+            block_lines.append(stripped)
+            block_words += 1
+            glue_next = True
+            previous = stripped
+            continue
+
+        major = bool(_MAJOR_RE.match(stripped)) and not _CONTINUES_RE.search(previous)
+        if not glue_next and (major or _PARAGRAPH_RE.match(stripped)):
+            flush_block()
+            block_major = major
+
+        glue_next = False
+        previous = stripped
+        block_lines.append(stripped)
+        block_words += len(stripped.split())
+
+    flush_block()
+    flush_chunk()
+    return chunks
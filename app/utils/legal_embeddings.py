@@ -1,20 +1,146 @@
 # app/utils/legal_embeddings.py
-# app/utils/legal_embeddings.py
+# Legal-BERT sentence embeddings
+#
+# torch / sentence-transformers are imported and the model is loaded on
+# first use (get_model), so importing this module is cheap. Set
+# EMBED_WARMUP=1 to load it at API startup instead (see main.py).
+#
+# With EMBEDDING_SERVER_SOCKET set, the model lives in a separate process
+# (app/utils/embedding_server.py) shared by every API worker.
 import os
-import torch
+import threading
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
-# HARD FORCE CPU + SINGLE THREAD (optional)
+# HARD FORCE CPU
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
-torch.set_num_threads(1)
-torch.set_num_interop_threads(1)
+
+# Thread policy: EMBED_WORKERS concurrent embedding jobs, each with
+# EMBED_THREADS intra-op threads → workers * threads never exceeds the cores.
+CPU_COUNT = os.cpu_count() or 1
+EMBED_WORKERS = max(1, int(os.getenv("EMBED_WORKERS", str(max(1, CPU_COUNT // 4)))))
+EMBED_THREADS = max(1, int(os.getenv("EMBED_THREADS", str(max(1, CPU_COUNT // EMBED_WORKERS)))))
 
 MODEL_NAME = "nlpaueb/legal-bert-base-uncased"
 
-print("🔹 Loading embedding model...")
-model = SentenceTransformer(MODEL_NAME, device="cpu")
-print("✅ Embedding model loaded")
+# Inference backend:
+#   torch → fp32 (reference)
+#   int8  → torch dynamic int8 quantization of the Linear layers
+#   onnx  → onnxruntime via sentence-transformers (needs optimum[onnxruntime])
+EMBEDDING_BACKENDS = ("torch", "int8", "onnx")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+if EMBEDDING_BACKEND not in EMBEDDING_BACKENDS:
+    raise ValueError(
+        f"EMBEDDING_BACKEND must be one of {EMBEDDING_BACKENDS}, got {EMBEDDING_BACKEND!r}"
+    )
+
+
+def model_id(backend: str) -> str:
+    # fp32 keeps the bare name so existing cached vectors stay valid
+    return MODEL_NAME if backend == "torch" else f"{MODEL_NAME}@{backend}"
+
+
+# Identifies the vectors this module produces (persistent cache key)
+EMBEDDING_MODEL_ID = model_id(EMBEDDING_BACKEND)
+
+# Texts per forward pass when embedding many chunks at once
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+
+EMBEDDING_SERVER_SOCKET = os.getenv("EMBEDDING_SERVER_SOCKET")
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def load_model(backend: str = None):
+    """Builds a fresh model for `backend` (get_model caches the configured one)."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    backend = backend or EMBEDDING_BACKEND
+    torch.set_num_threads(EMBED_THREADS)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # only settable once per process
+
+    if backend == "onnx":
+        try:
+            return SentenceTransformer(MODEL_NAME, device="cpu", backend="onnx")
+        except ImportError as e:
+            raise RuntimeError(
+                "EMBEDDING_BACKEND=onnx needs: pip install 'optimum[onnxruntime]'"
+            ) from e
+
+    model = SentenceTransformer(MODEL_NAME, device="cpu")
+    if backend == "int8":
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+    return model
+
+
+def get_model():
+    """Loads the model once, on first use (thread-safe)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                print(f"🔹 Loading embedding model ({EMBEDDING_BACKEND})...")
+                _model = load_model(EMBEDDING_BACKEND)
+                print("✅ Embedding model loaded")
+    return _model
+
+
+def is_model_loaded() -> bool:
+    return _model is not None
+
+
+_remote = None
+_remote_lock = threading.Lock()
+
+
+def _remote_client():
+    """
+    EmbeddingClient when an embedding server is configured, else None.
+    Refuses a server running another backend: its vectors would be cached
+    under this worker's EMBEDDING_MODEL_ID.
+    """
+    global _remote
+    if EMBEDDING_SERVER_SOCKET and _remote is None:
+        with _remote_lock:
+            if _remote is None:
+                from app.utils.embedding_server import EmbeddingClient
+                client = EmbeddingClient(EMBEDDING_SERVER_SOCKET)
+                server_model_id = client.info()["model_id"]
+                if server_model_id != EMBEDDING_MODEL_ID:
+                    raise RuntimeError(
+                        f"Embedding server at {EMBEDDING_SERVER_SOCKET} runs {server_model_id}, "
+                        f"this worker expects {EMBEDDING_MODEL_ID} (check EMBEDDING_BACKEND)"
+                    )
+                _remote = client
+    return _remote
+
+
+def warm_up():
+    """Loads the model and runs one forward pass (first request pays nothing)."""
+    remote = _remote_client()
+    if remote is not None:
+        remote.embed_texts(["warm up"])
+        return
+    get_model().encode("warm up", show_progress_bar=False)
+
+
+def embedding_dimension() -> int:
+    """Vector size of the loaded model (no forward pass needed)."""
+    remote = _remote_client()
+    if remote is not None:
+        return remote.dimension()
+    return embedding_dimension_local()
+
+
+def embedding_dimension_local() -> int:
+    return get_model().get_sentence_embedding_dimension()
+
 
 def embed_text(text: str) -> np.ndarray:
     """
@@ -22,12 +148,63 @@ def embed_text(text: str) -> np.ndarray:
     Handles long text.
     """
     if not text.strip():
-        return np.zeros(model.get_sentence_embedding_dimension(), dtype="float32")
-    
-    emb = model.encode(
+        return np.zeros(embedding_dimension(), dtype="float32")
+
+    remote = _remote_client()
+    if remote is not None:
+        return remote.embed_texts([text])[0]
+
+    emb = get_model().encode(
         text,
         convert_to_numpy=True,
         normalize_embeddings=True,
         show_progress_bar=False
     )
     return emb.astype("float32")
+
+
+def embed_texts(texts, batch_size: int = None, progress=None) -> np.ndarray:
+    """
+    Batched version of embed_text.
+    Returns a (len(texts), dim) float32 matrix in the SAME order as `texts`.
+
+    Texts are bucketed by length before batching so each forward pass
+    pads to a similar sequence length; blank texts get zero vectors.
+    progress(done, total) is called after every batch.
+    """
+    remote = _remote_client()
+    if remote is not None:
+        return remote.embed_texts(texts, batch_size=batch_size, progress=progress)
+    return embed_texts_local(texts, batch_size=batch_size, progress=progress)
+
+
+def embed_texts_local(texts, batch_size: int = None, progress=None, model=None) -> np.ndarray:
+    """
+    embed_texts on this process's own model (used by the embedding server).
+    `model` overrides the configured one (backend comparisons).
+    """
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    model = model or get_model()
+    out = np.zeros((len(texts), model.get_sentence_embedding_dimension()), dtype="float32")
+
+    # Longest first → padding inside a batch stays minimal
+    order = sorted(
+        (i for i, t in enumerate(texts) if t.strip()),
+        key=lambda i: len(texts[i]),
+        reverse=True
+    )
+
+    for start in range(0, len(order), batch_size):
+        batch_ids = order[start:start + batch_size]
+        embs = model.encode(
+            [texts[i] for i in batch_ids],
+            batch_size=len(batch_ids),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        out[batch_ids] = embs.astype("float32")
+        if progress:
+            progress(start + len(batch_ids), len(order))
+
+    return out
@@ -0,0 +1,143 @@
+# app/utils/query_batcher.py
+# Micro-batching for query embeddings
+#
+# Concurrent retrievals each need one short query vector. Instead of one
+# batch-size-1 forward pass per caller, callers enqueue their text and a
+# single dispatcher thread embeds whatever arrived within
+# QUERY_BATCH_WAIT_MS (or QUERY_BATCH_MAX texts) in one embed_texts call,
+# then hands each caller its row.
+
+import os
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from app.utils.query_cache import query_cache
+
+QUERY_BATCHING = os.getenv("QUERY_BATCHING", "1") == "1"
+QUERY_BATCH_MAX = int(os.getenv("QUERY_BATCH_MAX", "16"))
+QUERY_BATCH_WAIT_MS = float(os.getenv("QUERY_BATCH_WAIT_MS", "5"))
+
+# Latency / batch-size samples kept for percentiles
+_SAMPLES = 2048
+
+
+class QueryBatcher:
+    """
+    batcher.embed(text) blocks the calling thread until its vector is ready.
+    batcher.submit(text) returns a concurrent.futures.Future instead.
+    """
+
+    def __init__(
+        self,
+        encode_fn,
+        max_batch: int = QUERY_BATCH_MAX,
+        max_wait_ms: float = QUERY_BATCH_WAIT_MS
+    ):
+        self.encode_fn = encode_fn  # list[str] → (n, dim) array
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=_SAMPLES)  # seconds, enqueue → result
+        self._batch_sizes = deque(maxlen=_SAMPLES)
+        self.requests = 0
+        self.batches = 0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="query-batcher", daemon=True
+                    )
+                    self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        self._ensure_started()
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.submit(text).result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                vectors = self.encode_fn([text for text, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            done = time.perf_counter()
+            for row, (_, future, queued_at) in enumerate(batch):
+                future.set_result(vectors[row])
+
+            with self._stats_lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self._batch_sizes.append(len(batch))
+                self._latencies.extend(done - queued_at for _, _, queued_at in batch)
+
+    def stats(self):
+        with self._stats_lock:
+            latencies = np.array(self._latencies) * 1000
+            sizes = np.array(self._batch_sizes)
+            return {
+                "enabled": QUERY_BATCHING,
+                "requests": self.requests,
+                "batches": self.batches,
+                "mean_batch_size": round(float(sizes.mean()), 2) if len(sizes) else 0.0,
+                "max_batch_size": int(sizes.max()) if len(sizes) else 0,
+                "p50_ms": round(float(np.percentile(latencies, 50)), 2) if len(latencies) else 0.0,
+                "p99_ms": round(float(np.percentile(latencies, 99)), 2) if len(latencies) else 0.0,
+            }
+
+
+def _encode(texts):
+    from app.utils.legal_embeddings import embed_texts
+    return embed_texts(texts, batch_size=QUERY_BATCH_MAX)
+
+
+query_batcher = QueryBatcher(_encode)
+
+
+def embed_query(text: str) -> np.ndarray:
+    """
+    Query vector: LRU query cache first, then the micro-batcher
+    (embed_text when batching is disabled). The result is read-only.
+    """
+    from app.utils.legal_embeddings import EMBEDDING_MODEL_ID, embed_text
+
+    key = query_cache.key(text, EMBEDDING_MODEL_ID)
+    vector = query_cache.get(key)
+    if vector is not None:
+        return vector
+
+    vector = query_batcher.embed(text) if QUERY_BATCHING else embed_text(text)
+    vector = np.array(vector, dtype="float32")  # own copy, not a view of the batch
+    query_cache.put(key, vector)
+    return vector
@@ -0,0 +1,68 @@
+# app/utils/query_cache.py
+# In-process LRU of query vectors
+#
+# Draft regeneration (new tone / language, same facts) and repeated analysis
+# retrieve with the exact same query text; its vector is reused instead of
+# re-embedded. Keys hash the normalized text plus the embedding model id.
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))  # vectors; 0 disables
+
+
+def normalize_query(text: str) -> str:
+    # Legal-BERT is uncased and whitespace-insensitive
+    return " ".join(text.lower().split())
+
+
+class QueryVectorCache:
+    """Thread-safe LRU: key(text) → read-only float32 vector."""
+
+    def __init__(self, capacity: int = QUERY_CACHE_SIZE):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str, model_id: str) -> str:
+        payload = f"{model_id}\n{normalize_query(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key: str):
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: str, vector):
+        if self.capacity <= 0:
+            return
+        vector.setflags(write=False)  # shared between callers
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+query_cache = QueryVectorCache()
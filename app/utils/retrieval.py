@@ -1,31 +1,72 @@
 # app/utils/retrieval.py
-from app.utils.chunk_and_index import load_faiss_index
+import os
+from app.utils.chunk_and_index import load_hybrid_index
+from app.utils.bm25 import reciprocal_rank_fusion
+from app.utils.query_batcher import embed_query
 import numpy as np
 
-def retrieve_top_k_chunks(query: str, k: int = 5, doc_hash: str = None, index=None, metadata=None):
+# "hybrid" (BM25 + dense, fused) or "dense"
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Each ranker contributes this many candidates per requested chunk
+CANDIDATE_FACTOR = 4
+
+
+def retrieve_top_k_chunks(
+    query: str,
+    k: int = 5,
+    doc_hash: str = None,
+    index=None,
+    metadata=None,
+    bm25=None,
+    mode: str = None
+):
     """
     Retrieve top-k most relevant chunks from a document's FAISS index.
 
-    - If `doc_hash` is provided, it loads the FAISS index for that document.
-    - Otherwise, you can pass `index` and `metadata` directly.
+    - If `doc_hash` is provided, it loads the FAISS + BM25 indexes for that document.
+    - Otherwise, you can pass `index` and `metadata` (and optionally `bm25`) directly.
+    - In hybrid mode dense and BM25 rankings are merged with reciprocal-rank
+      fusion, so exact references ("Section 16(4)", "DRC-01A", GSTINs) are
+      not lost to the embedding.
     """
+    mode = mode or RETRIEVAL_MODE
+
     # 1️⃣ Load per-document index if not provided
     if index is None or metadata is None:
         if doc_hash is None:
             raise ValueError("Either index/metadata or doc_hash must be provided")
-        index, metadata = load_faiss_index(doc_hash)
+        index, metadata, bm25 = load_hybrid_index(doc_hash)
         if index is None or metadata is None:
             return []
 
+    hybrid = mode == "hybrid" and bm25 is not None
+    candidates = max(k * CANDIDATE_FACTOR, 20) if hybrid else k
+
     # 2️⃣ Embed the query
-    from app.utils.legal_embeddings import embed_text
-    query_vec = embed_text(query).reshape(1, -1).astype(np.float32)
+    query_vec = embed_query(query).reshape(1, -1).astype(np.float32)
 
     # 3️⃣ Search FAISS
-    D, I = index.search(query_vec, k)
-    results = []
-    for i in I[0]:
-        if i < len(metadata):
-            results.append(metadata[i]["text"])
+    D, I = index.search(query_vec, candidates)
+    dense = [int(i) for i in I[0] if 0 <= i < len(metadata)]   # FAISS pads with -1 when k > ntotal
+
+    if not hybrid:
+        return [metadata[i]["text"] for i in dense[:k]]
+
+    # 4️⃣ Lexical ranking + fusion
+    lexical = [i for i, _ in bm25.top_k(query, k=candidates) if i < len(metadata)]
+    fused = reciprocal_rank_fusion([dense, lexical])
+    return [metadata[i]["text"] for i, _ in fused[:k]]
+
+
+def search_corpus(query: str, k: int = 5, doc_hashes=None):
+    """
+    Search the global corpus store.
+
+    - `doc_hashes=None` searches across all documents.
+    - Otherwise only the listed documents are searched.
+    RETURNS: list of {"doc_hash", "chunk_id", "text", "score"}
+    """
+    from app.utils.vector_store import corpus_store
 
-    return results
+    query_vec = embed_query(query).reshape(1, -1).astype(np.float32)
+    return corpus_store.search(query_vec, k=k, doc_hashes=doc_hashes)
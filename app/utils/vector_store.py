@@ -0,0 +1,483 @@
+# app/utils/vector_store.py
+# Global corpus vector store (all documents, one place)
+#
+# Vectors live in a few HNSW shards. Every vector id encodes its document:
+#     id = doc_seq << 32 | chunk_id
+# so the doc_id column costs nothing and a document is an id range.
+#
+# Chunk text is not duplicated here: hits are resolved through the
+# per-document chunk store (index_data/<hash>/chunks.bin).
+#
+# Writes append: a new document's vectors go to deltas/<seq>.npy and are
+# searched exactly until CORPUS_COMPACT_DOCS pending documents accumulate
+# on a shard; then that shard is rewritten once with all of them.
+# Registry, delta and shard writes hold a cross-process file lock, so
+# several uvicorn workers can index concurrently.
+#
+# faiss is imported inside the methods that need it (keeps API startup light).
+#
+# Migration of the old per-document folders / forcing a compaction:
+#     python -m app.utils.vector_store migrate
+#     python -m app.utils.vector_store compact
+
+import os
+import sys
+import json
+import threading
+import numpy as np
+from collections import OrderedDict
+from filelock import FileLock
+
+from app.utils.chunk_store import load_chunks, read_doc_metadata
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+INDEX_ROOT = os.path.join(BASE_DIR, "index_data")
+CORPUS_DIR = os.path.join(INDEX_ROOT, "_corpus")
+
+CORPUS_SHARDS = int(os.getenv("CORPUS_SHARDS", "4"))
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+
+# Pending (delta) documents per shard before the shard is rewritten
+CORPUS_COMPACT_DOCS = int(os.getenv("CORPUS_COMPACT_DOCS", "32"))
+
+# Filters covering at most this many chunks are searched exactly
+FILTER_EXACT_MAX = 20000
+
+# Chunk stores kept open for resolving hits (each holds a mapping of chunks.bin)
+CORPUS_OPEN_CHUNK_STORES = int(os.getenv("CORPUS_OPEN_CHUNK_STORES", "256"))
+
+
+def _vector_ids(seq: int, num_chunks: int) -> np.ndarray:
+    return (np.int64(seq) << 32) + np.arange(num_chunks, dtype="int64")
+
+
+def _split_id(vector_id: int):
+    return int(vector_id) >> 32, int(vector_id) & 0xFFFFFFFF
+
+
+def _top_k(hits, k: int):
+    """Sorted (distance, id) pairs, one per id: a reader racing a compaction
+    can see a document both in its delta and in the rewritten shard."""
+    seen = set()
+    out = []
+    for dist, vector_id in sorted(hits, key=lambda h: h[0]):
+        if vector_id in seen:
+            continue
+        seen.add(vector_id)
+        out.append((dist, vector_id))
+        if len(out) == k:
+            break
+    return out
+
+
+def _tmp_path(path: str) -> str:
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+class CorpusStore:
+    """
+    Unified store for every indexed document.
+    - search(..., doc_hashes=None)  → global search across all matters
+    - search(..., doc_hashes=[...]) → restricted to those documents
+    """
+
+    def __init__(self, root: str = CORPUS_DIR, num_shards: int = CORPUS_SHARDS):
+        self.root = root
+        self.num_shards = num_shards
+        self._lock = threading.RLock()
+        self._registry = None
+        self._registry_mtime = None
+        self._shards = {}  # shard → (mtime, index)
+        self._deltas = {}  # seq → vectors of a pending document
+        self._chunks = OrderedDict()  # doc_hash → chunk store, LRU
+
+    # ---------- paths ----------
+
+    def _shard_path(self, shard: int):
+        return os.path.join(self.root, f"shard_{shard}.index")
+
+    def _delta_path(self, seq: int):
+        return os.path.join(self.root, "deltas", f"{seq}.npy")
+
+    def _write_lock(self):
+        """Cross-process lock for every registry / delta / shard write."""
+        os.makedirs(self.root, exist_ok=True)
+        return FileLock(os.path.join(self.root, "corpus.lock"))
+
+    def _chunk_text(self, doc_hash: str, chunk_id: int) -> str:
+        chunks = self._chunks.get(doc_hash)
+        if chunks is None:
+            chunks = load_chunks(os.path.join(INDEX_ROOT, doc_hash))
+            if chunks is None:
+                return ""
+            self._chunks[doc_hash] = chunks
+            while len(self._chunks) > CORPUS_OPEN_CHUNK_STORES:
+                _, evicted = self._chunks.popitem(last=False)
+                if hasattr(evicted, "close"):  # legacy pickles are plain lists
+                    evicted.close()
+        else:
+            self._chunks.move_to_end(doc_hash)
+        return chunks[chunk_id]["text"] if chunk_id < len(chunks) else ""
+
+    # ---------- registry (doc_hash → seq / shard / num_chunks, file_name → latest doc_hash) ----------
+
+    def _load_registry(self, force: bool = False):
+        path = os.path.join(self.root, "documents.json")
+        mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+        if force or self._registry is None or mtime != self._registry_mtime:
+            if mtime is None:
+                self._registry = {"next_seq": 0, "documents": {}}
+            else:
+                with open(path, "r") as f:
+                    self._registry = json.load(f)
+            self._registry_mtime = mtime
+
+            if "latest_by_name" not in self._registry:  # registries written before lineage lookup
+                by_name = {}
+                for h, d in sorted(self._registry["documents"].items(), key=lambda e: e[1]["seq"]):
+                    if d.get("file_name"):
+                        by_name[d["file_name"]] = h
+                self._registry["latest_by_name"] = by_name
+
+            pending = {d["seq"] for d in self._registry["documents"].values() if d.get("pending")}
+            for seq in list(self._deltas):
+                if seq not in pending:
+                    del self._deltas[seq]  # compacted (possibly by another worker)
+        return self._registry
+
+    def _save_registry(self):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, "documents.json")
+        tmp = _tmp_path(path)
+        with open(tmp, "w") as f:
+            json.dump(self._registry, f)
+        os.replace(tmp, path)
+        self._registry_mtime = os.stat(path).st_mtime_ns
+
+    # ---------- shards ----------
+
+    def _load_shard(self, shard: int, dim: int = None, fresh: bool = False):
+        """fresh=True re-reads the file even if the cached copy looks current."""
+        import faiss
+
+        index_path = self._shard_path(shard)
+        mtime = os.stat(index_path).st_mtime_ns if os.path.exists(index_path) else None
+
+        cached = self._shards.get(shard)
+        if not fresh and cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        if mtime is None:
+            if dim is None:
+                return None
+            hnsw = faiss.IndexHNSWFlat(dim, HNSW_M)
+            hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+            index = faiss.IndexIDMap2(hnsw)
+        else:
+            index = faiss.read_index(index_path)
+
+        self._shards[shard] = (mtime, index)
+        return index
+
+    def _save_shard(self, shard: int, index):
+        import faiss
+
+        os.makedirs(self.root, exist_ok=True)
+        index_path = self._shard_path(shard)
+
+        tmp = _tmp_path(index_path)
+        faiss.write_index(index, tmp)
+        os.replace(tmp, index_path)
+
+        self._shards[shard] = (os.stat(index_path).st_mtime_ns, index)
+
+    # ---------- deltas (documents not yet compacted into their shard) ----------
+
+    def _write_delta(self, seq: int, vectors: np.ndarray):
+        path = self._delta_path(seq)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = _tmp_path(path)
+        with open(tmp, "wb") as f:
+            np.save(f, vectors)
+        os.replace(tmp, path)
+        self._deltas[seq] = vectors
+
+    def _load_delta(self, seq: int):
+        vectors = self._deltas.get(seq)
+        if vectors is None:
+            try:
+                vectors = np.load(self._delta_path(seq))
+            except OSError:
+                return None  # compacted meanwhile; the shard has it
+            self._deltas[seq] = vectors
+        return vectors
+
+    def _compact_shard(self, shard: int):
+        """Caller holds both locks and a freshly loaded registry."""
+        pending = [
+            d for d in self._registry["documents"].values()
+            if d["shard"] == shard and d.get("pending")
+        ]
+        if not pending:
+            return
+
+        loaded = [(d, self._load_delta(d["seq"])) for d in pending]
+        loaded = [(d, v) for d, v in loaded if v is not None]
+        if not loaded:
+            return
+
+        index = self._load_shard(shard, dim=loaded[0][1].shape[1], fresh=True)
+        for doc, vectors in loaded:
+            index.add_with_ids(vectors, _vector_ids(doc["seq"], doc["num_chunks"]))
+        self._save_shard(shard, index)
+
+        # Registry before deleting deltas: readers never lose a document
+        for doc, _ in loaded:
+            doc["pending"] = False
+        self._save_registry()
+
+        for doc, _ in loaded:
+            self._deltas.pop(doc["seq"], None)
+            try:
+                os.remove(self._delta_path(doc["seq"]))
+            except OSError:
+                pass
+
+    def compact(self):
+        """Folds every pending delta into its shard."""
+        with self._lock, self._write_lock():
+            self._load_registry(force=True)
+            for shard in range(self.num_shards):
+                self._compact_shard(shard)
+
+    # ---------- write ----------
+
+    def has_document(self, doc_hash: str) -> bool:
+        with self._lock:
+            return doc_hash in self._load_registry()["documents"]
+
+    def add_document(self, doc_hash: str, vectors: np.ndarray, file_name: str = None):
+        """
+        Adds one document's chunk vectors (row i = chunk i). Re-adding a known
+        doc_hash is a no-op (same hash → same text → same vectors).
+        Cost is one delta file; the shard is only rewritten every
+        CORPUS_COMPACT_DOCS documents.
+        """
+        if len(vectors) == 0:
+            return
+
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+
+        with self._lock, self._write_lock():
+            # Another worker may have written since we last looked
+            registry = self._load_registry(force=True)
+            if doc_hash in registry["documents"]:
+                return
+
+            seq = registry["next_seq"]
+            shard = seq % self.num_shards
+            self._write_delta(seq, vectors)
+
+            registry["documents"][doc_hash] = {
+                "seq": seq,
+                "shard": shard,
+                "num_chunks": len(vectors),
+                "file_name": file_name,
+                "pending": True,
+            }
+            if file_name:
+                registry["latest_by_name"][file_name] = doc_hash
+            registry["next_seq"] = seq + 1
+            self._save_registry()
+
+            pending = sum(
+                1 for d in registry["documents"].values()
+                if d["shard"] == shard and d.get("pending")
+            )
+            if pending >= CORPUS_COMPACT_DOCS:
+                self._compact_shard(shard)
+
+    # ---------- read ----------
+
+    def latest_by_name(self, file_name: str):
+        """doc_hash most recently added under this file name (or None)."""
+        with self._lock:
+            return self._load_registry()["latest_by_name"].get(file_name)
+
+    def search(self, query_vec: np.ndarray, k: int = 5, doc_hashes=None):
+        """
+        RETURNS: list of {"doc_hash", "chunk_id", "text", "score"} sorted by
+        L2 distance (lower = closer).
+        """
+        query_vec = np.ascontiguousarray(query_vec, dtype="float32").reshape(1, -1)
+
+        # Snapshot under the lock, search without it. Loaded shard indexes
+        # are never mutated (compaction adds to a freshly read copy), so
+        # concurrent searches can share them.
+        with self._lock:
+            docs = self._load_registry()["documents"]
+            seq_to_hash = {d["seq"]: h for h, d in docs.items()}
+
+            if doc_hashes is None:
+                selected = list(docs.values())
+            else:
+                selected = [docs[h] for h in doc_hashes if h in docs]
+                if not selected:
+                    return []
+
+            pending = [(d, self._load_delta(d["seq"])) for d in selected if d.get("pending")]
+            compacted = [d for d in selected if not d.get("pending")]
+            shards = {s: self._load_shard(s) for s in sorted({d["shard"] for d in compacted})}
+
+        hits = self._search_pending(query_vec, k, pending)
+        if doc_hashes is None:
+            hits += self._search_all(query_vec, k, shards)
+        else:
+            hits += self._search_filtered(query_vec, k, compacted, shards)
+        hits = _top_k(hits, k)
+
+        with self._lock:
+            results = []
+            for dist, vector_id in hits:
+                seq, chunk_id = _split_id(vector_id)
+                doc_hash = seq_to_hash.get(seq)
+                results.append({
+                    "doc_hash": doc_hash,
+                    "chunk_id": chunk_id,
+                    "text": self._chunk_text(doc_hash, chunk_id) if doc_hash else "",
+                    "score": float(dist),
+                })
+            return results
+
+    @staticmethod
+    def _search_pending(query_vec, k, pending):
+        """Exact search over delta vectors (bounded by CORPUS_COMPACT_DOCS per shard)."""
+        hits = []
+        for doc, vecs in pending:
+            if vecs is None:
+                continue
+            ids = _vector_ids(doc["seq"], len(vecs))
+            dists = ((vecs - query_vec) ** 2).sum(axis=1)
+            top = np.argsort(dists)[:k]
+            hits.extend((float(dists[j]), int(ids[j])) for j in top)
+        return hits
+
+    @staticmethod
+    def _search_all(query_vec, k, shards):
+        import faiss
+
+        hits = []
+        params = faiss.SearchParametersHNSW(efSearch=max(HNSW_EF_SEARCH, k * 2))
+        for index in shards.values():
+            if index is None or index.ntotal == 0:
+                continue
+            D, I = index.search(query_vec, k, params=params)
+            hits.extend(
+                (d, i) for d, i in zip(D[0].tolist(), I[0].tolist()) if i != -1
+            )
+        return hits
+
+    @staticmethod
+    def _search_filtered(query_vec, k, selected, shards):
+        import faiss
+
+        by_shard = {}
+        for doc in selected:
+            by_shard.setdefault(doc["shard"], []).append(
+                _vector_ids(doc["seq"], doc["num_chunks"])
+            )
+
+        hits = []
+        for shard, id_lists in by_shard.items():
+            index = shards.get(shard)
+            if index is None:
+                continue
+            ids = np.concatenate(id_lists)
+
+            if len(ids) <= FILTER_EXACT_MAX:
+                # Small candidate set → exact distances are cheaper and lossless
+                vecs = index.reconstruct_batch(ids)
+                dists = ((vecs - query_vec) ** 2).sum(axis=1)
+                top = np.argsort(dists)[:k]
+                hits.extend((float(dists[j]), int(ids[j])) for j in top)
+            else:
+                params = faiss.SearchParametersHNSW(
+                    sel=faiss.IDSelectorBatch(ids),
+                    efSearch=max(HNSW_EF_SEARCH, k * 8)
+                )
+                D, I = index.search(query_vec, k, params=params)
+                hits.extend(
+                    (d, i) for d, i in zip(D[0].tolist(), I[0].tolist()) if i != -1
+                )
+
+        return hits
+
+    def stats(self):
+        with self._lock:
+            docs = self._load_registry()["documents"]
+            return {
+                "documents": len(docs),
+                "chunks": sum(d["num_chunks"] for d in docs.values()),
+                "pending_documents": sum(1 for d in docs.values() if d.get("pending")),
+                "shards": self.num_shards,
+            }
+
+
+corpus_store = CorpusStore()
+
+
+# ===================== MIGRATION =====================
+
+def migrate_legacy_indexes(index_root: str = INDEX_ROOT, store: CorpusStore = None):
+    """
+    Imports every index_data/<hash>/ folder (faiss.index + chunk metadata)
+    into the corpus store. Vectors are read back from the flat indexes, so
+    nothing is re-embedded. Safe to run repeatedly.
+    """
+    import faiss
+
+    store = store or corpus_store
+    imported, skipped = 0, 0
+
+    for doc_hash in sorted(os.listdir(index_root)):
+        folder = os.path.join(index_root, doc_hash)
+        index_path = os.path.join(folder, "faiss.index")
+
+        if doc_hash.startswith("_") or not os.path.isdir(folder):
+            continue
+
+        chunks = load_chunks(folder)
+        if not os.path.exists(index_path) or chunks is None:
+            print(f"⚠️ {doc_hash}: missing index or chunk metadata, skipped")
+            skipped += 1
+            continue
+        if store.has_document(doc_hash):
+            continue
+
+        index = faiss.read_index(index_path)
+        if index.ntotal != len(chunks):
+            print(f"⚠️ {doc_hash}: {index.ntotal} vectors vs {len(chunks)} chunks, skipped")
+            skipped += 1
+            continue
+
+        file_name = (read_doc_metadata(folder) or {}).get("file_name")
+
+        vectors = index.reconstruct_n(0, index.ntotal)
+        store.add_document(doc_hash, vectors, file_name)
+        imported += 1
+        print(f"✅ Imported {file_name or doc_hash} ({index.ntotal} chunks)")
+
+    store.compact()
+    print(f"Migration done: {imported} imported, {skipped} skipped")
+    return imported, skipped
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        migrate_legacy_indexes()
+    elif len(sys.argv) > 1 and sys.argv[1] == "compact":
+        corpus_store.compact()
+        print(f"✅ Compacted: {corpus_store.stats()}")
+    else:
+        print("usage: python -m app.utils.vector_store migrate | compact")
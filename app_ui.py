@@ -1,10 +1,11 @@
 # app_ui.py
 import os
 import json
-import pickle
+import time
 import streamlit as st
 import requests
 from app.utils.file_handler import read_file_content
+from app.utils.chunk_store import list_documents, load_chunks, read_doc_metadata
 
 API_URL = "http://127.0.0.1:8002/draft"
 INDEX_DATA_DIR = "index_data"
@@ -16,6 +17,49 @@ st.set_page_config(page_title="LexFlow Studio", layout="wide", page_icon="⚖️
 def populate_facts_from_keypoints(key_points):
     st.session_state.facts = "\n".join(key_points)
 
+STAGE_LABELS = {
+    "parse": "Parsing document",
+    "ocr": "Running OCR",
+    "embed": "Embedding chunks",
+    "analyze": "Analyzing with AI",
+    "enrich": "Searching precedents",
+}
+
+# Give up on a job that hasn't finished after this many seconds
+JOB_POLL_TIMEOUT = int(os.getenv("JOB_POLL_TIMEOUT", "900"))
+
+def poll_analysis_job(job_id):
+    """Polls a background analysis job, showing stage progress. Returns the result or None."""
+    bar = st.progress(0.0, text="Queued...")
+    deadline = time.monotonic() + JOB_POLL_TIMEOUT
+    while time.monotonic() < deadline:
+        res = requests.get(f"{API_URL}/jobs/{job_id}", timeout=30)
+        if res.status_code == 404:
+            bar.empty()
+            st.error("Analysis job not found on the server.")
+            return None
+        job = res.json()
+
+        if job["status"] == "done":
+            bar.progress(1.0, text="Done")
+            return requests.get(f"{API_URL}/jobs/{job_id}/result", timeout=60).json()
+        if job["status"] == "failed":
+            bar.empty()
+            st.error(f"Analysis failed: {job.get('error')}")
+            return None
+
+        progress = job.get("progress") or {}
+        label = STAGE_LABELS.get(job.get("stage"), "Queued...")
+        if progress.get("total"):
+            label += f" ({progress['done']}/{progress['total']})"
+        stage_index = progress.get("stage_index", 0)
+        bar.progress(min(stage_index / max(progress.get("stages", 1), 1), 1.0), text=label)
+        time.sleep(1)
+
+    bar.empty()
+    st.error(f"Analysis did not finish within {JOB_POLL_TIMEOUT}s (job {job_id}).")
+    return None
+
 # ===================== CSS =====================
 st.markdown("""
 <style>
@@ -40,20 +84,21 @@ if uploaded_file:
 
     if st.button("🔍 Analyze Document"):
         uploaded_file.seek(0)
-        with st.spinner("Analyzing document..."):
-            try:
-                res = requests.post(
-                    f"{API_URL}/analyze-document",
-                    files={"file": (uploaded_file.name, uploaded_file.getvalue())},
-                    timeout=600
-                )
-                if res.status_code == 200:
-                    st.session_state["doc_analysis"] = res.json()
+        try:
+            res = requests.post(
+                f"{API_URL}/analyze-document/jobs",
+                files={"file": (uploaded_file.name, uploaded_file.getvalue())},
+                timeout=60
+            )
+            if res.status_code == 202:
+                result = poll_analysis_job(res.json()["job_id"])
+                if result is not None:
+                    st.session_state["doc_analysis"] = result
                     st.toast("Document analyzed successfully")
-                else:
-                    st.error(f"Analysis failed: {res.text}")
-            except requests.exceptions.RequestException as e:
-                st.error(f"Error analyzing document: {e}")
+            else:
+                st.error(f"Analysis failed: {res.text}")
+        except requests.exceptions.RequestException as e:
+            st.error(f"Error analyzing document: {e}")
 
 st.title("⚖️ LexFlow AI - Drafting Studio")
 
@@ -176,6 +221,21 @@ for k, v in defaults.items():
         st.session_state[k] = v
 
 # ===================== HELPERS =====================
+def iter_sse_events(response):
+    """Yields (event, data) from a text/event-stream response; data is JSON-decoded."""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if not line:
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
 def force_refresh_editor(new_text=""):
     st.session_state["draft"] = new_text
     st.rerun()
@@ -216,50 +276,17 @@ def fetch_case_laws():
 
 
 def get_available_documents():
-    base_dir = "index_data"
-    docs_map = {}
-
-    if not os.path.exists(base_dir):
-        return docs_map
-
-    for doc_hash in os.listdir(base_dir):
-        doc_dir = os.path.join(base_dir, doc_hash)
-
-        if not os.path.isdir(doc_dir):
-            continue
-
-        metadata_path = os.path.join(doc_dir, "doc_metadata.pkl")
-        if not os.path.exists(metadata_path):
-            continue
-
-        try:
-            with open(metadata_path, "rb") as f:
-                data = pickle.load(f)
-
-            file_name = data.get("file_name")
-            if file_name:
-                docs_map[file_name] = doc_hash
-
-        except Exception:
-            continue
-
-    return docs_map
+    return list_documents(INDEX_DATA_DIR)
 
 
 def load_doc_analysis_by_hash(doc_hash):
     folder = os.path.join("index_data", doc_hash)
-    doc_meta_path = os.path.join(folder, "doc_metadata.pkl")
-    chunk_meta_path = os.path.join(folder, "chunks_metadata.pkl")
+    doc_meta = read_doc_metadata(folder)
+    chunks = load_chunks(folder)
 
-    if not os.path.exists(doc_meta_path) or not os.path.exists(chunk_meta_path):
+    if doc_meta is None or chunks is None:
         return None
 
-    with open(doc_meta_path, "rb") as f:
-        doc_meta = pickle.load(f)
-
-    with open(chunk_meta_path, "rb") as f:
-        chunks = pickle.load(f)
-
     full_text = "\n".join(c["text"] for c in chunks)
 
     # Simple heuristics for client/opposite
@@ -387,13 +414,9 @@ with col_left:
             # fallback: load from saved chunks & metadata
             if not analysis:
                 folder = os.path.join("index_data", doc_hash)
-                doc_meta_path = os.path.join(folder, "doc_metadata.pkl")
-                chunk_meta_path = os.path.join(folder, "chunks_metadata.pkl")
-                if os.path.exists(doc_meta_path) and os.path.exists(chunk_meta_path):
-                    with open(doc_meta_path, "rb") as f:
-                        doc_meta = pickle.load(f)
-                    with open(chunk_meta_path, "rb") as f:
-                        chunks = pickle.load(f)
+                doc_meta = read_doc_metadata(folder)
+                chunks = load_chunks(folder)
+                if doc_meta is not None and chunks is not None:
                     full_text = "\n".join(c["text"] for c in chunks)
                     analysis = {
                         "document_metadata": doc_meta,
@@ -459,13 +482,26 @@ with col_left:
         }
 
         try:
-            res = requests.post(f"{API_URL}/generate", json=payload, timeout=600)
-            if res.status_code == 200:
-                data = res.json()
-                st.session_state["warnings"] = data.get("warnings", [])
-                force_refresh_editor(data["content"])
-            else:
-                st.error(f"Draft generation failed: {res.text}")
+            with col_center:
+                live_draft = st.empty()
+
+            draft_text, done = "", None
+            with requests.post(f"{API_URL}/generate/stream", json=payload, stream=True, timeout=600) as res:
+                if res.status_code != 200:
+                    st.error(f"Draft generation failed: {res.text}")
+                else:
+                    for event, data in iter_sse_events(res):
+                        if event == "token":
+                            draft_text += data
+                            live_draft.text(draft_text)
+                        elif event == "done":
+                            done = data
+                        elif event == "error":
+                            st.error(f"Draft generation failed: {data}")
+
+            if done is not None:
+                st.session_state["warnings"] = done.get("warnings", [])
+                force_refresh_editor(draft_text.strip())
         except requests.exceptions.RequestException as e:
             st.error(f"Error generating draft: {e}")
 
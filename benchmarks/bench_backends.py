@@ -0,0 +1,56 @@
+# benchmarks/bench_backends.py
+# Embedding throughput per inference backend (fp32 torch / int8 / onnx)
+#
+#   python -m benchmarks.bench_backends [backend,backend,...] [path/to/notice.pdf]
+
+import sys
+import time
+
+from app.utils.chunk_and_index import chunk_text
+from app.utils.legal_embeddings import EMBEDDING_BACKENDS, embed_texts_local, load_model
+from benchmarks.bench_embeddings import SAMPLE_PARAGRAPH
+
+
+def _load_text(path):
+    if path is None:
+        return SAMPLE_PARAGRAPH * 1500
+    from app.utils.file_handler import read_file_content
+
+    class Dummy:
+        def __init__(self, p):
+            self.file = open(p, "rb")
+            self.filename = p
+
+    return read_file_content(Dummy(path))
+
+
+def run_bench():
+    backends = EMBEDDING_BACKENDS
+    path = None
+    for arg in sys.argv[1:]:
+        if all(b in EMBEDDING_BACKENDS for b in arg.split(",")):
+            backends = arg.split(",")
+        else:
+            path = arg
+
+    chunks = chunk_text(_load_text(path))
+    print(f"Chunks: {len(chunks)}")
+
+    for backend in backends:
+        try:
+            start = time.perf_counter()
+            model = load_model(backend)
+            load_secs = time.perf_counter() - start
+        except Exception as e:
+            print(f"{backend:<6} unavailable: {e}")
+            continue
+
+        embed_texts_local(chunks[:8], model=model)  # warm-up
+        start = time.perf_counter()
+        embed_texts_local(chunks, model=model)
+        elapsed = time.perf_counter() - start
+        print(f"{backend:<6} load {load_secs:6.1f}s  {len(chunks) / elapsed:8.1f} chunks/s")
+
+
+if __name__ == "__main__":
+    run_bench()
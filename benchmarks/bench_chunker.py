@@ -0,0 +1,109 @@
+# benchmarks/bench_chunker.py
+# Fixed 400-char windows vs structure-aware chunks
+#
+#   python -m benchmarks.bench_chunker [notice.pdf | labels.json] [k]
+#
+# labels.json: [{"file": "notices/scn_1.pdf",
+#                "queries": [{"query": "...", "relevant": ["DRC-01A"]}]}]
+# Reports chunk count, chunks per KB, chunking + embedding time and,
+# when queries are available, recall@k through hybrid retrieval.
+# Without arguments a synthetic structured notice with planted references is used.
+
+import sys
+import json
+import time
+
+import faiss
+
+from app.utils.bm25 import BM25Index
+from app.utils.chunk_and_index import chunk_text, chunk_fixed_windows
+from app.utils.legal_embeddings import embed_texts, embedding_dimension
+from app.utils.retrieval import retrieve_top_k_chunks
+from benchmarks.bench_retrieval import FILLER, PLANTED
+
+CHUNKERS = {
+    "fixed-400": chunk_fixed_windows,
+    "structure": chunk_text,
+}
+
+
+def _read(path):
+    from app.utils.file_handler import read_file_content
+
+    class Dummy:
+        def __init__(self, p):
+            self.file = open(p, "rb")
+            self.filename = p
+
+    return read_file_content(Dummy(path))
+
+
+def _synthetic_notice():
+    lines = [
+        "OFFICE OF THE ASSISTANT COMMISSIONER, CGST",
+        "M/s ABC Traders Pvt Ltd", "... Noticee", "Versus",
+        "Union of India", "... Department", "",
+    ]
+    for n in range(40):
+        lines.append(f"{n + 1}. {FILLER}")
+        if n % 10 == 5:
+            sentence, _, _ = PLANTED[(n // 10) % len(PLANTED)]
+            lines.append(f"Section {n + 10} Observations")
+            lines.append(FILLER + sentence)
+        lines.append("")
+    queries = [{"query": q, "relevant": [r]} for _, q, r in PLANTED]
+    return [("\n".join(lines), queries)]
+
+
+def _inputs():
+    args = [a for a in sys.argv[1:] if not a.isdigit()]
+    if not args:
+        return _synthetic_notice()
+    if args[0].endswith(".json"):
+        with open(args[0], "r", encoding="utf-8") as f:
+            return [(_read(e["file"]), e["queries"]) for e in json.load(f)]
+    return [(_read(args[0]), [])]
+
+
+def run_bench():
+    k = int(sys.argv[-1]) if len(sys.argv) > 1 and sys.argv[-1].isdigit() else 5
+    docs = _inputs()
+    kb = sum(len(text.encode("utf-8")) for text, _ in docs) / 1024
+    print(f"{len(docs)} document(s) | {kb:.0f} KB | k={k}")
+
+    for label, chunker in CHUNKERS.items():
+        chunk_secs = embed_secs = 0.0
+        n_chunks = recalled = total = 0
+
+        for text, queries in docs:
+            start = time.perf_counter()
+            chunks = chunker(text)
+            chunk_secs += time.perf_counter() - start
+
+            start = time.perf_counter()
+            vectors = embed_texts(chunks)
+            embed_secs += time.perf_counter() - start
+            n_chunks += len(chunks)
+
+            index = faiss.IndexFlatL2(embedding_dimension())
+            index.add(vectors)
+            metadata = [{"id": i, "text": c} for i, c in enumerate(chunks)]
+            bm25 = BM25Index.build(chunks)
+
+            for q in queries:
+                hits = retrieve_top_k_chunks(q["query"], k=k, index=index, metadata=metadata, bm25=bm25)
+                wanted = [r.lower() for r in q["relevant"]]
+                recalled += any(r in h.lower() for h in hits for r in wanted)
+                total += 1
+
+        line = (
+            f"{label:<10} {n_chunks:6d} chunks  {n_chunks / kb:5.2f}/KB  "
+            f"chunk {chunk_secs * 1000:7.1f} ms  embed {embed_secs:6.2f}s"
+        )
+        if total:
+            line += f"  recall@{k} {recalled / total:6.1%}"
+        print(line)
+
+
+if __name__ == "__main__":
+    run_bench()
@@ -0,0 +1,58 @@
+# benchmarks/bench_context_packing.py
+# Draft prompt context: naive top-5 join vs token-budgeted packing
+#
+#   python -m benchmarks.bench_context_packing [labels.json] [budget_tokens]
+#
+# Uses the same labels format as bench_retrieval. Reports context tokens
+# per prompt and whether the labeled reference still made it into the
+# context (recall). Fails if packing doesn't make the context smaller.
+
+import sys
+
+import numpy as np
+
+from app.services.ai_engine import MODEL_NAME, RAG_CANDIDATES
+from app.utils.context_packer import pack_context, count_tokens
+from app.utils.retrieval import retrieve_top_k_chunks
+from benchmarks.bench_retrieval import _labeled_set, _synthetic_set
+
+
+def run_bench():
+    path = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1].endswith(".json") else None
+    budget = int(sys.argv[-1]) if len(sys.argv) > 1 and sys.argv[-1].isdigit() else None
+
+    docs = _labeled_set(path) if path else _synthetic_set()
+    rows = {"top-5 join": [], "packed": []}
+    recall = {"top-5 join": 0, "packed": 0}
+    total = 0
+
+    for (index, metadata, bm25), queries in docs:
+        for q in queries:
+            chunks = retrieve_top_k_chunks(
+                q["query"], k=RAG_CANDIDATES, index=index, metadata=metadata, bm25=bm25
+            )
+            contexts = {
+                "top-5 join": "\n\n".join(chunks[:5]),
+                "packed": pack_context(chunks, budget_tokens=budget, model=MODEL_NAME)[0],
+            }
+            wanted = [r.lower() for r in q["relevant"]]
+            for label, context in contexts.items():
+                rows[label].append(count_tokens(context, MODEL_NAME))
+                if any(r in context.lower() for r in wanted):
+                    recall[label] += 1
+            total += 1
+
+    print(f"{total} prompts | model {MODEL_NAME}")
+    for label, tokens in rows.items():
+        print(
+            f"{label:<11} mean {np.mean(tokens):7.0f} tokens  "
+            f"max {np.max(tokens):6.0f}  recall {recall[label] / max(total, 1):6.1%}"
+        )
+
+    naive, packed = np.mean(rows["top-5 join"]), np.mean(rows["packed"])
+    assert packed < naive, f"packed context ({packed:.0f} tokens) is not smaller than top-5 join ({naive:.0f})"
+    print(f"✅ Packed context is {1 - packed / naive:.0%} smaller")
+
+
+if __name__ == "__main__":
+    run_bench()
@@ -0,0 +1,55 @@
+# benchmarks/bench_embeddings.py
+# Chunks/sec: one-by-one embed_text vs batched embed_texts
+#
+#   python -m benchmarks.bench_embeddings [path/to/notice.pdf]
+
+import sys
+import time
+
+from app.utils.chunk_and_index import chunk_text
+from app.utils.legal_embeddings import embed_text, embed_texts
+
+SAMPLE_PARAGRAPH = (
+    "WHEREAS the noticee has availed input tax credit under Section 16 of the "
+    "CGST Act, 2017 and the proper officer alleges that the conditions under "
+    "Section 16(4) were not satisfied for the period in question. "
+)
+
+
+def load_text():
+    if len(sys.argv) > 1:
+        from app.utils.file_handler import read_file_content
+
+        class Dummy:
+            def __init__(self, path):
+                self.file = open(path, "rb")
+                self.filename = path
+
+        return read_file_content(Dummy(sys.argv[1]))
+
+    # ~300 KB synthetic notice
+    return SAMPLE_PARAGRAPH * 1500
+
+
+def run_bench():
+    chunks = chunk_text(load_text())
+    print(f"Chunks: {len(chunks)}")
+
+    start = time.perf_counter()
+    for chunk in chunks:
+        embed_text(chunk)
+    single = time.perf_counter() - start
+    print(f"embed_text loop : {len(chunks) / single:8.1f} chunks/sec ({single:.2f}s)")
+
+    for batch_size in (16, 32, 64):
+        start = time.perf_counter()
+        embed_texts(chunks, batch_size=batch_size)
+        batched = time.perf_counter() - start
+        print(
+            f"embed_texts b={batch_size:<3}: {len(chunks) / batched:8.1f} chunks/sec "
+            f"({batched:.2f}s, x{single / batched:.1f})"
+        )
+
+
+if __name__ == "__main__":
+    run_bench()
@@ -0,0 +1,80 @@
+# benchmarks/bench_ocr.py
+# Old in-memory sequential OCR vs streaming parallel ocr_pdf
+#
+#   python -m benchmarks.bench_ocr [path/to/scanned.pdf] [repeat]
+#
+# `repeat` concatenates the PDF's pages N times to mimic long scanned orders.
+
+import os
+import sys
+import time
+import resource
+import subprocess
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Demo_nda.pdf")
+
+
+def _load_pdf(path: str, repeat: int) -> bytes:
+    with open(path, "rb") as f:
+        raw = f.read()
+    if repeat <= 1:
+        return raw
+
+    from io import BytesIO
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(BytesIO(raw))
+    writer = PdfWriter()
+    for _ in range(repeat):
+        for page in reader.pages:
+            writer.add_page(page)
+    out = BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def _legacy_ocr(file_bytes: bytes) -> str:
+    import pytesseract
+    from pdf2image import convert_from_bytes
+
+    text = ""
+    for img in convert_from_bytes(file_bytes):
+        text += pytesseract.image_to_string(img) + "\n"
+    return text.strip()
+
+
+def _child(mode: str, path: str, repeat: int):
+    file_bytes = _load_pdf(path, repeat)
+    start = time.perf_counter()
+    if mode == "legacy":
+        text = _legacy_ocr(file_bytes)
+    else:
+        from app.utils.file_handler import ocr_pdf
+        text = ocr_pdf(file_bytes)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{elapsed:.3f}\t{peak_mb:.1f}\t{len(text)}")
+
+
+def run_bench():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PDF
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    print(f"PDF: {os.path.basename(path)} x{repeat}")
+    print("mode       seconds   peak RSS MB   chars")
+    for mode in ("legacy", "streaming"):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_ocr", "--child", mode, path, str(repeat)],
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip().splitlines()[-1]
+        elapsed, peak, chars = out.split("\t")
+        print(f"{mode:<9} {float(elapsed):8.2f}   {float(peak):11.1f}   {chars}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        _child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        run_bench()
@@ -0,0 +1,108 @@
+# benchmarks/bench_retrieval.py
+# Dense vs hybrid (BM25 + dense, RRF) retrieval: latency and recall@k
+#
+#   python -m benchmarks.bench_retrieval [labels.json] [k]
+#
+# labels.json (one entry per indexed notice):
+#   [{"doc_hash": "0a84b45dcfa2",
+#     "queries": [{"query": "DRC-01A intimation date",
+#                  "relevant": ["DRC-01A"]}]}]
+# A query counts as recalled when any of the top-k chunks contains one of
+# its "relevant" strings (case-insensitive), so labels survive re-chunking.
+# Without labels.json a synthetic notice with planted references is used.
+
+import sys
+import json
+import time
+
+import faiss
+import numpy as np
+
+from app.utils.bm25 import BM25Index
+from app.utils.chunk_and_index import chunk_text, load_hybrid_index
+from app.utils.legal_embeddings import embed_texts, embedding_dimension
+from app.utils.retrieval import retrieve_top_k_chunks
+
+FILLER = (
+    "The proper officer has examined the returns filed by the noticee for the "
+    "relevant tax period and is of the view that the tax liability declared "
+    "does not reflect the outward supplies made. "
+)
+
+PLANTED = [
+    ("Intimation in FORM GST DRC-01A was issued on 12.03.2024 before this notice.",
+     "when was the DRC-01A intimation issued", "DRC-01A"),
+    ("The registered person bearing GSTIN 27AAPFU0939F1ZV is the noticee herein.",
+     "which GSTIN is the noticee", "27AAPFU0939F1ZV"),
+    ("Credit availed after the due date is barred under Section 16(4) of the CGST Act.",
+     "time limit for availing ITC under Section 16(4)", "Section 16(4)"),
+    ("Penalty equal to ten per cent of tax is proposed under Section 73(9).",
+     "penalty proposed under Section 73(9)", "Section 73(9)"),
+]
+
+
+def _synthetic_set():
+    paragraphs = [FILLER * 3] * 60
+    for n, (sentence, _, _) in enumerate(PLANTED):
+        paragraphs[(n + 1) * 12] = FILLER + sentence + " " + FILLER
+    chunks = chunk_text("\n\n".join(paragraphs))
+
+    vectors = embed_texts(chunks)
+    index = faiss.IndexFlatL2(embedding_dimension())
+    index.add(vectors)
+    metadata = [{"id": i, "text": c} for i, c in enumerate(chunks)]
+    bm25 = BM25Index.build(chunks)
+
+    queries = [{"query": q, "relevant": [r]} for _, q, r in PLANTED]
+    return [((index, metadata, bm25), queries)]
+
+
+def _labeled_set(path):
+    with open(path, "r", encoding="utf-8") as f:
+        labels = json.load(f)
+    docs = []
+    for entry in labels:
+        loaded = load_hybrid_index(entry["doc_hash"])
+        if loaded[0] is None:
+            print(f"⚠️ {entry['doc_hash']}: not indexed, skipped")
+            continue
+        docs.append((loaded, entry["queries"]))
+    return docs
+
+
+def _evaluate(docs, k, mode):
+    latencies, recalled, total = [], 0, 0
+    for (index, metadata, bm25), queries in docs:
+        for q in queries:
+            start = time.perf_counter()
+            chunks = retrieve_top_k_chunks(
+                q["query"], k=k, index=index, metadata=metadata, bm25=bm25, mode=mode
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            wanted = [r.lower() for r in q["relevant"]]
+            if any(r in c.lower() for c in chunks for r in wanted):
+                recalled += 1
+            total += 1
+    return recalled / max(total, 1), latencies
+
+
+def run_bench():
+    path = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1].endswith(".json") else None
+    k = int(sys.argv[-1]) if len(sys.argv) > 1 and sys.argv[-1].isdigit() else 5
+
+    docs = _labeled_set(path) if path else _synthetic_set()
+    n = sum(len(q) for _, q in docs)
+    print(f"{len(docs)} document(s) | {n} queries | k={k}")
+
+    for mode in ("dense", "hybrid"):
+        recall, latencies = _evaluate(docs, k, mode)
+        print(
+            f"{mode:<7} recall@{k} {recall:6.1%}  "
+            f"p50 {np.percentile(latencies, 50):6.1f} ms  "
+            f"p95 {np.percentile(latencies, 95):6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    run_bench()
@@ -0,0 +1,105 @@
+# benchmarks/bench_scraper.py
+# Legal research scraper against a local stub HTTP server
+#
+#   python -m benchmarks.bench_scraper [pages] [latency_seconds]
+#
+# Compares sequential requests.get (old pattern) with the concurrent
+# fetcher, then re-runs it warm (page cache) and stale (ETag → 304).
+
+import sys
+import time
+import asyncio
+import hashlib
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_LATENCY = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+
+
+class StubCourtHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    not_modified = 0
+
+    def do_GET(self):
+        time.sleep(STUB_LATENCY)
+        body = (
+            f"<html><title>State of Maharashtra v. Case {self.path}</title>"
+            "<p>The appeal is allowed.</p><p>Section 16(4) considered.</p></html>"
+        ).encode("utf-8")
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+
+        if self.headers.get("If-None-Match") == etag:
+            StubCourtHandler.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCourtHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _sequential(urls):
+    import requests
+    for url in urls:
+        requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=15)
+
+
+def run_benchmark():
+    from app.services.scraper import PageCache, PageFetcher, scrape_legal_context_async
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    server = start_stub_server()
+    urls = [f"http://127.0.0.1:{server.server_address[1]}/judgment/{i}" for i in range(n)]
+
+    cache = PageCache(cache_dir=tempfile.mkdtemp(prefix="page_cache_"))
+    fetcher = PageFetcher(allowed_domains=["127.0.0.1"], cache=cache, per_domain=n)
+
+    async def scrape():
+        return await scrape_legal_context_async(
+            "input tax credit", "generic",
+            search_fn=lambda q: urls, fetcher=fetcher, use_local=False
+        )
+
+    print(f"{n} pages | stub latency {STUB_LATENCY:.2f}s")
+
+    start = time.perf_counter()
+    _sequential(urls)
+    print(f"{'sequential requests':<24} {time.perf_counter() - start:7.2f}s")
+
+    start = time.perf_counter()
+    results = asyncio.run(scrape())
+    print(f"{'concurrent (cold)':<24} {time.perf_counter() - start:7.2f}s  {len(results)} cases")
+
+    start = time.perf_counter()
+    asyncio.run(scrape())
+    print(f"{'concurrent (cached)':<24} {time.perf_counter() - start:7.2f}s")
+
+    cache.ttl = 0  # everything stale → conditional requests
+    start = time.perf_counter()
+    asyncio.run(scrape())
+    print(
+        f"{'concurrent (revalidate)':<24} {time.perf_counter() - start:7.2f}s  "
+        f"{StubCourtHandler.not_modified} × 304"
+    )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,72 @@
+# benchmarks/bench_startup.py
+# Cold-start time and memory per endpoint family
+#
+#   python -m benchmarks.bench_startup
+#
+# Every family runs in a fresh interpreter: import the modules behind the
+# endpoints, then make the first call. Reports wall time, peak RSS and
+# which heavy libraries ended up loaded.
+
+import sys
+import json
+import time
+import subprocess
+
+HEAVY = ["torch", "sentence_transformers", "faiss", "pdfplumber", "pytesseract", "pdf2image", "docx", "xhtml2pdf"]
+
+FAMILIES = {
+    "api import (main)": "import main",
+    "export pdf": (
+        "from app.services.export_engine import export_to_pdf\n"
+        "export_to_pdf('# Reply\\n\\nIt is respectfully submitted that...')"
+    ),
+    "export word": (
+        "from app.services.export_engine import export_to_word\n"
+        "export_to_word('# Reply\\n\\nIt is respectfully submitted that...')"
+    ),
+    "generate (import)": "from app.services.ai_engine import generate_legal_draft",
+    "parse pdf (import)": "from app.utils.file_handler import extract_pdf_pages\nimport pdfplumber",
+    "embed (first query)": (
+        "from app.utils.legal_embeddings import embed_text\n"
+        "embed_text('input tax credit under Section 16(4)')"
+    ),
+}
+
+
+def _child(code: str):
+    import resource
+
+    start = time.perf_counter()
+    exec(compile(code, "<family>", "exec"), {})
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "seconds": elapsed,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "loaded": [m for m in HEAVY if m in sys.modules],
+    }))
+
+
+def run_bench():
+    print(f"{'family':<22} {'seconds':>8} {'peak RSS':>10}  heavy modules loaded")
+    for label, code in FAMILIES.items():
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_startup", "--child", code],
+            capture_output=True, text=True
+        )
+        lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            print(f"{label:<22} failed: {proc.stderr.strip().splitlines()[-1:]}")
+            continue
+        r = json.loads(lines[-1])
+        print(
+            f"{label:<22} {r['seconds']:8.2f} {r['rss_mb']:8.0f} MB  "
+            f"{', '.join(r['loaded']) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        _child(sys.argv[2])
+    else:
+        run_bench()
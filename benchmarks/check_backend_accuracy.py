@@ -0,0 +1,85 @@
+# benchmarks/check_backend_accuracy.py
+# Accuracy regression of an embedding backend against the fp32 baseline
+#
+#   python -m benchmarks.check_backend_accuracy int8|onnx [max_docs] [k]
+#
+# For every stored document (index_data/<hash>/) the chunks are embedded
+# with fp32 torch and with the candidate backend, then compared on:
+#   - cosine similarity of each chunk's two vectors
+#   - recall@k: share of the fp32 top-k chunks the candidate also returns,
+#     using the opening of sampled chunks as queries
+# Exits non-zero when thresholds are not met, so it can gate a rollout.
+
+import os
+import sys
+
+import numpy as np
+
+from app.utils.chunk_store import INDEX_ROOT, load_chunks
+from app.utils.legal_embeddings import EMBEDDING_BACKENDS, embed_texts_local, load_model
+
+MIN_MEAN_COSINE = 0.99
+MIN_RECALL = 0.9
+QUERIES_PER_DOC = 10
+QUERY_CHARS = 200
+
+
+def _documents(max_docs: int):
+    docs = []
+    for doc_hash in sorted(os.listdir(INDEX_ROOT)):
+        folder = os.path.join(INDEX_ROOT, doc_hash)
+        if doc_hash.startswith("_") or not os.path.isdir(folder):
+            continue
+        chunks = load_chunks(folder)
+        if chunks:
+            docs.append((doc_hash, [c["text"] for c in chunks]))
+        if len(docs) >= max_docs:
+            break
+    return docs
+
+
+def _top_k(vectors, queries, k):
+    # Vectors are normalized → inner product ranks like L2
+    return np.argsort(-(queries @ vectors.T), axis=1)[:, :k]
+
+
+def run_check():
+    backend = sys.argv[1] if len(sys.argv) > 1 else "int8"
+    max_docs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    k = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    if backend not in EMBEDDING_BACKENDS or backend == "torch":
+        sys.exit("usage: python -m benchmarks.check_backend_accuracy int8|onnx [max_docs] [k]")
+
+    docs = _documents(max_docs)
+    if not docs:
+        sys.exit(f"No stored documents under {INDEX_ROOT}")
+
+    baseline, candidate = load_model("torch"), load_model(backend)
+    cosines, recalls = [], []
+    rng = np.random.default_rng(0)
+
+    for doc_hash, chunks in docs:
+        base_vecs = embed_texts_local(chunks, model=baseline)
+        cand_vecs = embed_texts_local(chunks, model=candidate)
+        cosines.extend((base_vecs * cand_vecs).sum(axis=1).tolist())
+
+        picks = rng.choice(len(chunks), size=min(QUERIES_PER_DOC, len(chunks)), replace=False)
+        queries = [chunks[i][:QUERY_CHARS] for i in picks]
+        base_top = _top_k(base_vecs, embed_texts_local(queries, model=baseline), k)
+        cand_top = _top_k(cand_vecs, embed_texts_local(queries, model=candidate), k)
+        recalls.extend(
+            len(set(b) & set(c)) / len(b) for b, c in zip(base_top.tolist(), cand_top.tolist())
+        )
+
+    cosines, recalls = np.array(cosines), np.array(recalls)
+    print(f"{backend} vs fp32 | {len(docs)} document(s) | {len(cosines)} chunks | k={k}")
+    print(f"cosine   mean {cosines.mean():.4f}  min {cosines.min():.4f}  p1 {np.percentile(cosines, 1):.4f}")
+    print(f"recall@{k} mean {recalls.mean():.3f}  min {recalls.min():.3f}")
+
+    ok = cosines.mean() >= MIN_MEAN_COSINE and recalls.mean() >= MIN_RECALL
+    print("✅ PASS" if ok else f"❌ FAIL (need cosine ≥ {MIN_MEAN_COSINE}, recall ≥ {MIN_RECALL})")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    run_check()
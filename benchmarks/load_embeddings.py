@@ -0,0 +1,70 @@
+# benchmarks/load_embeddings.py
+# Throughput of concurrent indexing jobs vs EMBED_WORKERS
+#
+#   python -m benchmarks.load_embeddings [jobs] [workers,workers,...]
+#
+# Each worker count runs in a fresh process because the torch thread
+# policy is fixed when the model is first loaded.
+
+import os
+import sys
+import subprocess
+import time
+import asyncio
+
+SAMPLE_PARAGRAPH = (
+    "The show cause notice alleges wrongful availment of input tax credit "
+    "and proposes a demand with interest under Section 50 and penalty under "
+    "Section 74 of the CGST Act, 2017. "
+)
+
+
+async def _run_jobs(jobs: int):
+    from app.utils.chunk_and_index import chunk_text
+    from app.utils.embedding_pool import run_embedding_job
+    from app.utils.legal_embeddings import embed_texts, warm_up
+
+    # Distinct text per job, same size as a ~40 page notice
+    docs = [chunk_text(f"Notice {j}. " + SAMPLE_PARAGRAPH * 300) for j in range(jobs)]
+
+    # The model loads lazily: keep load time out of chunks/sec
+    warm_up()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_embedding_job(embed_texts, chunks) for chunks in docs))
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(c) for c in docs)
+    print(f"{total}\t{elapsed:.3f}")
+
+
+def run_load_test():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    cpu = os.cpu_count() or 1
+    if len(sys.argv) > 2:
+        worker_counts = [int(w) for w in sys.argv[2].split(",")]
+    else:
+        worker_counts = [w for w in (1, 2, 4, 8, 16) if w <= cpu]
+
+    print(f"CPU cores: {cpu} | concurrent jobs: {jobs}")
+    print("workers  threads/worker  chunks/sec")
+
+    for workers in worker_counts:
+        env = dict(os.environ, EMBED_WORKERS=str(workers))
+        env.pop("EMBED_THREADS", None)
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.load_embeddings", "--child", str(jobs)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip().splitlines()[-1]
+        total, elapsed = out.split("\t")
+        print(f"{workers:7d}  {max(1, cpu // workers):14d}  {int(total) / float(elapsed):10.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        asyncio.run(_run_jobs(int(sys.argv[2])))
+    else:
+        run_load_test()
@@ -0,0 +1,93 @@
+# benchmarks/load_llm.py
+# Concurrent LLM throughput against a local mock OpenAI server
+#
+#   python -m benchmarks.load_llm [requests] [latency_seconds]
+#
+# Compares the old pattern (sync client called inside async handlers,
+# which serializes on the event loop) with the shared AsyncOpenAI client.
+
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_LATENCY = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        model = json.loads(body or b"{}").get("model", "mock")
+        time.sleep(MOCK_LATENCY)
+
+        payload = json.dumps({
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "It is respectfully submitted that..."},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_mock_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def _sync_client_in_loop(n: int):
+    from openai import OpenAI
+    client = OpenAI()
+
+    async def call():
+        client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": "ping"}]
+        )
+
+    await asyncio.gather(*(call() for _ in range(n)))
+
+
+async def _async_client(n: int):
+    from app.services.ai_engine import refine_text
+    await asyncio.gather(*(refine_text("Draft text", "Make it firmer") for _ in range(n)))
+
+
+def run_load_test():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+
+    server = start_mock_server()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ["OPENAI_API_KEY"] = "mock-key"
+
+    print(f"{n} concurrent requests | mock latency {MOCK_LATENCY:.2f}s")
+    for label, fn in (("sync client in loop", _sync_client_in_loop), ("AsyncOpenAI pool", _async_client)):
+        start = time.perf_counter()
+        asyncio.run(fn(n))
+        elapsed = time.perf_counter() - start
+        print(f"{label:<20} {elapsed:7.2f}s  {n / elapsed:7.1f} req/s")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    run_load_test()
@@ -0,0 +1,53 @@
+# benchmarks/load_queries.py
+# Concurrent query embedding: one forward pass per query vs micro-batching
+#
+#   python -m benchmarks.load_queries [queries] [threads]
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.utils.legal_embeddings import embed_text, warm_up
+from app.utils.query_batcher import QueryBatcher, _encode
+
+QUERY = "Whether input tax credit is barred under Section 16(4) for invoices of {}"
+
+
+def _measure(label, fn, n, threads):
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        fn(QUERY.format(i))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(n)))
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{label:<14} {n / elapsed:8.1f} q/s  "
+        f"p50 {np.percentile(latencies, 50):7.1f} ms  p99 {np.percentile(latencies, 99):7.1f} ms"
+    )
+
+
+def run_load_test():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    warm_up()
+    print(f"{n} queries | {threads} concurrent callers")
+
+    _measure("embed_text", embed_text, n, threads)
+
+    batcher = QueryBatcher(_encode)
+    _measure("micro-batched", batcher.embed, n, threads)
+    stats = batcher.stats()
+    print(f"{'':<14} mean batch {stats['mean_batch_size']}  max batch {stats['max_batch_size']}")
+
+
+if __name__ == "__main__":
+    run_load_test()
@@ -1,8 +1,38 @@
 #main.py
+import os
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.routers.drafting import router as drafting_router
 
-app = FastAPI(title="Drafting Studio API")
+# Embedding model loads on first use; EMBED_WARMUP=1 loads it in the
+# background at startup so the first upload doesn't pay for it.
+EMBED_WARMUP = os.getenv("EMBED_WARMUP", "0") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.services.job_queue import job_queue
+    interrupted = job_queue.store.fail_orphans()
+    if interrupted:
+        print(f"⚠️ Marked {interrupted} interrupted job(s) as failed")
+
+    expired = job_queue.store.purge_expired()
+    if expired:
+        print(f"🧹 Removed {expired} expired job record(s)")
+
+    if EMBED_WARMUP:
+        from app.utils.embedding_pool import run_embedding_job
+        from app.utils.legal_embeddings import warm_up
+        app.state.warmup_task = asyncio.create_task(run_embedding_job(warm_up))
+    yield
+
+    # The API loop's pooled scraper client goes down with the loop
+    from app.services.scraper import page_fetcher
+    await page_fetcher.aclose()
+
+
+app = FastAPI(title="Drafting Studio API", lifespan=lifespan)
 
 app.include_router(drafting_router)
 app.include_router(drafting_router, prefix="/draft")  